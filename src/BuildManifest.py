@@ -0,0 +1,192 @@
+#--------------------------------------------------------------------------
+# File and Version Information:
+#  $Id$
+#
+# Description:
+#  Module BuildManifest...
+#
+#------------------------------------------------------------------------
+
+"""Manifest of generated files used for incremental regeneration.
+
+Manifest is a JSON file with one entry per backend invocation (backend
+name plus its header and source names). Entry records configuration
+digest (backend name and options, psddl sources, template files), the
+digests of all DDL files read to build the model, resolution of every
+include statement and the digests of produced output files. Backend
+does not need to run again if all of these are unchanged.
+
+This software was developed for the LCLS project.  If you use all or
+part of it, please give an appropriate acknowledgment.
+
+@version $Id$
+"""
+
+
+#------------------------------
+#  Module's version from CVS --
+#------------------------------
+__version__ = "$Revision$"
+# $Source$
+
+#--------------------------------
+#  Imports of standard modules --
+#--------------------------------
+import sys
+import os
+import json
+import hashlib
+import logging
+
+#---------------------------------
+#  Imports of base class module --
+#---------------------------------
+
+#-----------------------------
+# Imports for other modules --
+#-----------------------------
+from psddl.ModelCache import codeDigest, fileDigest, findInclude
+
+#----------------------------------
+# Local non-exported definitions --
+#----------------------------------
+
+# change this when format of the manifest changes
+_FORMAT = 1
+
+# packages providing templates for backends
+_templatePackages = ['psddl', 'psana_test', 'Translator']
+
+def _digests(paths):
+    ''' make a dict mapping path to its digest, None for missing files '''
+    res = {}
+    for path in paths:
+        try:
+            res[path] = fileDigest(path)
+        except (IOError, OSError):
+            res[path] = None
+    return res
+
+#------------------------
+# Exported definitions --
+#------------------------
+
+#---------------------
+#  Class definition --
+#---------------------
+class BuildManifest ( object ) :
+
+    #----------------
+    #  Constructor --
+    #----------------
+    def __init__ ( self, path, inc_dir ) :
+        '''Constructor
+
+           @param path     name of the manifest file, it does not need to exist
+           @param inc_dir  list of include directories
+        '''
+        self.path = path
+        self.inc_dir = list(inc_dir or [])
+        self._templates = None
+
+        self._entries = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('format') == _FORMAT:
+                self._entries = data.get('entries', {})
+        except (IOError, OSError, ValueError) as ex:
+            logging.debug("BuildManifest: cannot read manifest %s: %s", path, ex)
+
+    #-------------------
+    #  Public methods --
+    #-------------------
+
+    def config(self, backend, backend_options, *extra):
+        '''
+        Returns tuple (key, config) for backend invocation, key identifies entry
+        in the manifest, config is a digest of everything except contents of DDL
+        files that can change output.
+
+          @param backend          backend name
+          @param backend_options  dictionary of options passed to backend
+          @param extra            any other values which affect the model, including the
+                                  list of input files given on command line
+        '''
+        key = '%s:%s:%s' % (backend, backend_options.get('global:header'), backend_options.get('global:source'))
+        h = hashlib.sha1()
+        h.update(repr([_FORMAT, backend, sorted(backend_options.items()), codeDigest(),
+                       self._templateDigest(), self.inc_dir, list(extra)]).encode())
+        return key, h.hexdigest()
+
+    def isUpToDate(self, key, config):
+        '''
+        Returns true if the outputs for the entry are up to date
+        '''
+        entry = self._entries.get(key)
+        if entry is None or entry['config'] != config:
+            return False
+
+        for inc, path in entry['includes']:
+            if findInclude(inc, self.inc_dir) != path:
+                return False
+
+        for digests in (entry['inputs'], entry['outputs']):
+            for path, digest in digests.items():
+                try:
+                    if fileDigest(path) != digest: return False
+                except (IOError, OSError):
+                    return False
+
+        return True
+
+    def update(self, key, config, inputs, includes, outputs):
+        '''
+        Update manifest entry after backend has finished
+
+          @param key       entry key returned from config()
+          @param config    config digest returned from config()
+          @param inputs    list of all DDL files which were read
+          @param includes  list of (name, path) for all include statements
+          @param outputs   list of all files produced by backend
+        '''
+        self._entries[key] = dict(config=config, includes=[list(inc) for inc in includes],
+                                  inputs=_digests(inputs), outputs=_digests(outputs))
+
+    def save(self):
+        '''
+        Write manifest to a file, errors are logged and otherwise ignored
+        '''
+        tmpfile = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmpfile, 'w') as f:
+                json.dump(dict(format=_FORMAT, entries=self._entries), f, indent=1, sort_keys=True)
+            os.rename(tmpfile, self.path)
+        except (IOError, OSError) as ex:
+            logging.warning("BuildManifest: failed to save manifest %s: %s", self.path, ex)
+            if os.path.exists(tmpfile): os.remove(tmpfile)
+
+    #--------------------
+    #  Private methods --
+    #--------------------
+
+    def _templateDigest(self):
+        ''' digest of all template files for all backends '''
+        if self._templates is None:
+            # TemplateLoader needs jinja2, only import it when manifest is used
+            from psddl.TemplateLoader import templateFiles
+            h = hashlib.sha1()
+            for package in _templatePackages:
+                for path in templateFiles(package):
+                    h.update(repr((path, fileDigest(path))).encode())
+            self._templates = h.hexdigest()
+        return self._templates
+
+#
+#  In case someone decides to run this module
+#
+if __name__ == "__main__" :
+
+    # In principle we can try to run test suite for this module,
+    # have to think about it later. Right now just abort.
+    sys.exit ( "Module is not supposed to be run as main module" )
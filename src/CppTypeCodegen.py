@@ -51,11 +51,9 @@ from psddl.JinjaEnvironment import getJinjaEnvironment
 #----------------------------------
 # Local non-exported definitions --
 #----------------------------------
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('cppcodegen.tmpl?'+template)
+    return getJinjaEnvironment().get_template('cppcodegen.tmpl?'+template)
 
 def _interpolate(expr, typeobj):
     
@@ -207,6 +205,12 @@ class CppTypeCodegen ( object ) :
                 access = self._access(meth.access, access)
                 self._genMethod(meth)
 
+        # psana value types with natural layout can share data with pdsdata objects,
+        # check at compile time that members have the offsets from DDL
+        if not self._pdsdata and not self._abs and self._type.naturalAlign():
+            access = self._access("public", access)
+            self._genLayoutCheck()
+
         # generate _shape() methods for array attributes
         for attr in self._type.attributes() :
             access = self._access("public", access)
@@ -274,6 +278,18 @@ class CppTypeCodegen ( object ) :
         print(decl, file=self._inc)
 
 
+    def _genLayoutCheck(self):
+        """Generate method with compile-time checks of member offsets and size"""
+
+        name = self._type.name
+        print("  /** Compile-time check that memory layout of this class agrees with DDL, pdsdata", file=self._inc)
+        print("      objects are used as instances of this class without conversion. */", file=self._inc)
+        print("  static void _layoutCheck() {", file=self._inc)
+        for attr in self._type.attributes():
+            print(T("    BOOST_STATIC_ASSERT(offsetof($name, $attr) == $offset);")(name=name, attr=attr.name, offset=attr.offset), file=self._inc)
+        print(T("    BOOST_STATIC_ASSERT(sizeof($name) == $size);")(name=name, size=self._type.size), file=self._inc)
+        print("  }", file=self._inc)
+
     def _genMethod(self, meth):
         """Generate method declaration and definition"""
 
@@ -39,6 +39,7 @@ import os
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.Package import Package
 from psddl.Type import Type
 from psddl.H5Type import H5Type
@@ -101,7 +102,7 @@ class DdlDumpHddl ( object ) :
     def parseTree ( self, model ) :
         
         # open output files
-        self.out = file(self.outname, 'w')
+        self.out = OutputFile(self.outname)
 
         # headers for other included packages
         for use in model.use:
@@ -454,6 +455,9 @@ class DdlDumpHddl ( object ) :
                     tags.append('external')
             if 'vlen' in ds.tags: tags.append('vlen')
             if 'zero_dims' in ds.tags: tags.append('zero_dims')
+            if ds.chunk is not None: tags.append('chunk({0})'.format(ds.chunk))
+            if ds.deflate is not None: tags.append('deflate({0})'.format(ds.deflate))
+            if ds.shuffle is not None: tags.append('shuffle' if ds.shuffle else 'shuffle(0)')
             
             if ds.method:
                 
@@ -475,7 +479,7 @@ class DdlDumpHddl ( object ) :
                 
                 tags = _fmttags1(tags)
                 if tags: tags = ' '+tags
-                print(T("  @dataset $name {")(name=ds.name), file=self.out)
+                print(T("  @dataset $name$tags {")(name=ds.name, tags=tags), file=self.out)
                 for attr in ds.attributes:
 
                     tags = []
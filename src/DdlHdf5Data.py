@@ -45,6 +45,7 @@ import os
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.JinjaEnvironment import getJinjaEnvironment
 from psddl.Attribute import Attribute
 from psddl.Enum import Enum
@@ -60,19 +61,14 @@ from psddl import DdlHdf5DataHelpers as Helpers
 # Local non-exported definitions --
 #----------------------------------
 
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('hdf5.tmpl?'+template)
+    return getJinjaEnvironment().get_template('hdf5.tmpl?'+template)
 
 def _schemas(pkg):
     '''generator function for all schemas inside a package'''
-    for ns in pkg.namespaces() :
-        if isinstance(ns, Package) :
-            for schema in _schemas(ns): yield schema        
-        elif isinstance(ns, Type) :
-            for schema in ns.h5schemas: yield schema
+    for type in pkg.allTypes() :
+        for schema in type.h5schemas: yield schema
 
 #------------------------
 # Exported definitions --
@@ -83,6 +79,9 @@ def _schemas(pkg):
 #---------------------
 class DdlHdf5Data ( object ) :
 
+    # this backend adds default HDF5 schemas to types in the model
+    mutatesModel = True
+
     @staticmethod
     def backendOptions():
         """ Returns the list of options supported by this backend, returned value is 
@@ -128,8 +127,13 @@ class DdlHdf5Data ( object ) :
         if self.dump_schema: return self._dumpSchema(model)
         
         # open output files
-        self.inc = file(self.incname, 'w', 0)
-        self.cpp = file(self.cppname, 'w', 0)
+        self.inc = OutputFile(self.incname, 0)
+        self.cpp = OutputFile(self.cppname, 0)
+
+        # layouts of dataset structures already generated, and what we saved by reusing them
+        self._layouts = {}
+        self._dedupClasses = 0
+        self._dedupLines = 0
         
         # include guard to header
         print("#ifndef", self.guard, file=self.inc) 
@@ -148,12 +152,15 @@ class DdlHdf5Data ( object ) :
         print("#include \"hdf5pp/Group.h\"", file=self.inc)
         print("#include \"hdf5pp/Type.h\"", file=self.inc)
         print("#include \"PSEvt/Proxy.h\"", file=self.inc)
+        print("#include <vector>", file=self.cpp)
+        print("#include <boost/static_assert.hpp>", file=self.cpp)
         print("#include \"hdf5pp/ArrayType.h\"", file=self.cpp)
         print("#include \"hdf5pp/CompoundType.h\"", file=self.cpp)
         print("#include \"hdf5pp/EnumType.h\"", file=self.cpp)
         print("#include \"hdf5pp/VlenType.h\"", file=self.cpp)
         print("#include \"hdf5pp/Utils.h\"", file=self.cpp)
         print("#include \"PSEvt/DataProxy.h\"", file=self.cpp)
+        print("#include \"MsgLogger/MsgLogger.h\"", file=self.cpp)
         inc = os.path.join(self.incdirname, "Exceptions.h")
         print("#include \"%s\"" % inc, file=self.cpp)
         inc = os.path.join(self.incdirname, "ChunkPolicy.h")
@@ -221,6 +228,9 @@ class DdlHdf5Data ( object ) :
         # close include guard
         print("#endif //", self.guard, file=self.inc)
 
+        self._log.info("hdf5: %d dataset structures reuse identical layout of other structures, %d lines saved" % \
+                       (self._dedupClasses, self._dedupLines))
+
         # close all files
         self.inc.close()
         self.cpp.close()
@@ -306,6 +316,8 @@ class DdlHdf5Data ( object ) :
         
         versions = sorted(schema.version for schema in type.h5schemas)
         max_version = versions[-1]
+        staged_versions = [schema.version for schema in type.h5schemas 
+                           if 'external' not in schema.tags and Helpers.Schema(schema, self.psana_ns).staged]
         print(_TEMPL('store_impl').render(locals()), file=self.cpp)
 
     def _genSchema(self, type, schema):
@@ -321,7 +333,10 @@ class DdlHdf5Data ( object ) :
 
         for ds in hschema.datasets:
             # generate datasets classes
-            ds.genDs(self.inc, self.cpp)
+            saved = ds.genDs(self.inc, self.cpp, self._layouts)
+            if saved is not None:
+                self._dedupClasses += 1
+                self._dedupLines += saved
 
         hschema.genSchema(self.inc, self.cpp)
 
@@ -419,9 +434,7 @@ class DdlHdf5Data ( object ) :
             # if schema has no datasets but has 'default' tag then 
             # use default schema but merge their tags
             if not schema.datasets and 'default' in schema.tags:
-                defschema = H5Type.defaultSchema(type)
-                defschema.tags.update(schema.tags)
-                schema = defschema
+                schema = H5Type.defaultSchema(type, schema.tags)
                 type.h5schemas[i] = schema
 
     #--------------------
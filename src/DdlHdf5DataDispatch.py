@@ -45,12 +45,14 @@ import types
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.JinjaEnvironment import getJinjaEnvironment
 from psddl.H5Type import H5Type
 from psddl.Package import Package
 from psddl.Type import Type
 from psddl.Template import Template as T
 from psddl.TemplateLoader import TemplateLoader
+from psddl.PerfectHash import PerfectHash
 
 #----------------------------------
 # Local non-exported definitions --
@@ -77,56 +79,9 @@ _extra_headers = [
 # == code templates, usually do not need to touch these ==
 # ========================================================
 
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('hdf5.tmpl?'+template)
-
-class _DJB2a(object):
-    
-    def hash(self, string):
-        hash = 5381
-        for ch in string:
-            hash = ((hash*33) & 0xffffffff) ^ ord(ch)
-        return hash
-
-    def code(self):
-
-        return """
-namespace {
-    uint32_t str_hash(const std::string& str)
-    {
-        uint32_t hash = 5381;
-        for (std::string::const_iterator it = str.begin(); it != str.end(); ++it) {
-            hash = ((hash << 5) + hash) ^ uint32_t(*it); /* hash * 33 + c */
-        }
-        return hash;
-    }
-}"""
-
-class _sdbm(object):
-    
-    def hash(self, string):
-        hash = 0
-        for ch in string:
-            hash = ord(ch) + (hash << 6) + (hash << 16) - hash
-            hash = (2^32 + hash) % 2^32
-        return hash
-
-    def code(self):
-
-        return """
-namespace {
-    uint32_t str_hash(const std::string& str)
-    {
-        uint32_t hash = 0;
-        for (std::string::const_iterator it = str.begin(); it != str.end(); ++it) {
-            hash = uint32_t(c) + (hash << 6) + (hash << 16) - hash;
-        }
-        return hash;
-    }
-}"""
+    return getJinjaEnvironment().get_template('hdf5.tmpl?'+template)
 
 #------------------------
 # Exported definitions --
@@ -137,6 +92,9 @@ namespace {
 #---------------------
 class DdlHdf5DataDispatch ( object ) :
 
+    # this backend adds default HDF5 schemas to types in the model
+    mutatesModel = True
+
     @staticmethod
     def backendOptions():
         """ Returns the list of options supported by this backend, returned value is 
@@ -175,8 +133,8 @@ class DdlHdf5DataDispatch ( object ) :
     def parseTree ( self, model ) :
         
         # open output files
-        self.inc = file(self.incname, 'w')
-        self.cpp = file(self.cppname, 'w')
+        self.inc = OutputFile(self.incname)
+        self.cpp = OutputFile(self.cppname)
 
         # loop over packages in the model
         types = []
@@ -188,45 +146,23 @@ class DdlHdf5DataDispatch ( object ) :
                 if not ns.external:
                     types.append(ns)
 
-        typenames = [type.fullName('C++') for type in types] + list(_aliases.keys())
-
-        # select hash function with minimum collisions
-        hash = _DJB2a()
-        hashes = set([hash.hash(name) for name in typenames])
-        if len(hashes) == len(typenames):
-            self._log.debug("DJB2a without collisions")
-        else:
-            djb_coll = len(typenames) - len(hashes)
-            hash2 = _sdbm()
-            hashes = set([hash.hash(name) for name in typenames])
-            if len(hashes) == len(typenames):
-                self._log.debug("SDBM without collisions")
-                hash = hash2
-            else:
-                sdbm_coll = len(typenames) - len(hashes)
-                if sdbm_coll < djb_coll: hash = hash2
-
-
         # generate code for all collected types
         codes, headers = self._codegen(types)
 
         # add own header to the list
         headers = [os.path.join(self.incdirname, os.path.basename(self.incname))] + list(headers) + _extra_headers
 
-        hashes = {}
-        for type, code in codes.items():
-            name = type.fullName('C++')
-            hh = hash.hash(name)
-            hashes.setdefault(hh, []).append(dict(name=name, code=code))
-
+        # code for every type name and alias
+        name2code = dict((type.fullName('C++'), code) for type, code in codes.items())
         for alias, typeNames in _aliases.items():
-            acodes = []
-            for typeName in typeNames:
-                acodes += [code for type, code in codes.items() if type.fullName('C++') == typeName]
+            acodes = [name2code[typeName] for typeName in typeNames if typeName in name2code]
             if acodes:
-                hh = hash.hash(alias)
-                hashes.setdefault(hh, []).append(dict(name=alias, code='\n'.join(acodes)))
+                name2code[alias] = '\n'.join(acodes)
 
+        # dispatch uses index of the name in perfect hash table
+        hash = PerfectHash(sorted(name2code.keys()))
+        self._log.debug("parseTree: perfect hash for %d type names", len(hash.keys))
+        dispatch = [dict(name=name, code=name2code[name]) for name in hash.keys]
 
         inc_guard = self.guard
         namespace = self.top_pkg
@@ -43,6 +43,7 @@ from psddl.Enum import Enum
 from psddl.Constant import Constant
 from psddl.Attribute import Attribute
 from psddl.Method import Method
+from psddl.ExprVal import ExprVal
 from psddl.Template import Template as T
 from psddl.JinjaEnvironment import getJinjaEnvironment
 
@@ -50,11 +51,9 @@ from psddl.JinjaEnvironment import getJinjaEnvironment
 # Local non-exported definitions --
 #----------------------------------
 
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('hdf5.tmpl?'+template)
+    return getJinjaEnvironment().get_template('hdf5.tmpl?'+template)
 
 _log = logging.getLogger("DdlHdf5DataHelpers")
 
@@ -92,6 +91,76 @@ def _h5ds_typename(attr):
     aschema = attr.h5schema()
     if aschema: return aschema.datasets[0].classNameNs()
 
+def _intval(expr):
+    '''Return integer value of expression or None if it is not a constant'''
+    val = ExprVal(expr).value
+    if isinstance(val, int): return val
+
+def _layoutCompatible(type, h5ds):
+    '''
+    Returns true if memory layout of the dataset structure for h5ds (compound
+    dataset of a value type) is identical to the layout of the type itself.
+    Dataset structure has natural C layout of its members, type layout comes
+    from calcOffsets(), psana class for value type has the same members as
+    DDL type so with identical layouts array of dataset structures can be
+    used as array of psana objects without conversion.
+    '''
+    if not type.value_type or type.base: return False
+
+    attrs = list(type.attributes())
+    if len(attrs) != len(h5ds.attributes): return False
+
+    offset = 0
+    maxalign = 1
+    for attr, h5attr in zip(attrs, h5ds.attributes):
+
+        # each dataset attribute has to be the same type member
+        if h5attr.external or h5attr.sizeIsVlen() or attr.bitfields: return False
+        if not attr.accessor or attr.accessor.name != h5attr.method: return False
+        if h5attr.type is not attr.type or isinstance(attr.type, Enum) or not attr.type.basic: return False
+
+        count = 1
+        if attr.shape:
+            if not h5attr.shape or h5attr.shape.decl() != attr.shape.decl(): return False
+            count = _intval(attr.shape.size())
+        elif h5attr.rank > 0:
+            return False
+
+        # natural alignment of basic type is its size
+        size = _intval(attr.type.size)
+        if not size or not count: return False
+        offset = (offset + size - 1) // size * size
+        maxalign = max(maxalign, size)
+        if _intval(attr.offset) != offset: return False
+        offset += size * count
+
+    offset = (offset + maxalign - 1) // maxalign * maxalign
+    return _intval(type.size) == offset
+
+def _createArgs(h5ds):
+    '''
+    Returns chunk size, chunk cache size, deflate and shuffle arguments for
+    createDataset(), storage hints from dataset tags override chunk policy
+    and options given at run time.
+    '''
+    chunk = 'chunkPolicy.chunkSize(dstype)' if h5ds.chunk is None else str(h5ds.chunk)
+    deflate = 'deflate' if h5ds.deflate is None else str(h5ds.deflate)
+    shuffle = 'shuffle' if h5ds.shuffle is None else ('true' if h5ds.shuffle else 'false')
+    return ', '.join([chunk, 'chunkPolicy.chunkCacheSize(dstype)', deflate, shuffle])
+
+def _fixedSize(h5ds):
+    '''
+    Returns true if dataset structure for compound dataset h5ds has fixed size
+    and does not own any memory, elements of such datasets can be read in
+    batches into a single buffer.
+    '''
+    for attr in h5ds.attributes:
+        if attr.rank > 0 and (attr.sizeIsVlen() or not attr.sizeIsConst()): return False
+        if not attr.stor_type.basic:
+            aschema = attr.h5schema()
+            if not aschema or not _fixedSize(aschema.datasets[0]): return False
+    return True
+
 #------------------------
 # Exported definitions --
 #------------------------
@@ -192,6 +261,14 @@ class DSAttribute(object):
                         return [T('$dst(0)')(locals())]
         return []
                         
+    def ds_attr_assign(self):
+        '''Returns list of statements which replace initializers from ds_attr_init() in 
+        constructor of dataset structure which derives from structure with the same layout'''
+
+        attr = self.attr
+        if attr.external or attr.rank > 0: return []
+        return [T('this->$name = psanaobj.$method();')[attr]]
+
     def ds_attr_initcode(self):
         '''Returns list of statements to initialize attribute in dataset constructor'''
 
@@ -270,7 +347,7 @@ class DatasetCompound(object):
 
     def make_ds_impl(self):
         '''Returns piece of code implementing dataset creation code'''
-        return _TEMPL('make_compound_ds').render(ds=self.ds)
+        return _TEMPL('make_compound_ds').render(ds=self.ds, create_args=_createArgs(self.ds))
         
     def ds_write_impl(self):
         '''Returns piece of code implementing writing of the data to a dataset'''
@@ -281,7 +358,24 @@ class DatasetCompound(object):
         dsClassName = self.ds.classNameNs()
         return T('boost::shared_ptr<$dsClassName>')(locals())
 
-    def genDs(self, inc, cpp):
+    def fixed_size(self):
+        '''Returns true if dataset elements have fixed size and can be read or written in batches'''
+        return 'external' not in self.ds.tags and _fixedSize(self.ds)
+
+    def ds_batch_decl(self):
+        '''Returns the list of public declarations for the schema class to use data from batch reads'''
+        if not self.fixed_size(): return []
+        dsClassName = self.ds.classNameNs()
+        dsName = self.ds.name
+        return [_TEMPL('use_batch_method').render(locals())]
+
+    def genDs(self, inc, cpp, layouts=None):
+        '''
+        Generate dataset structure and its methods. If layouts dictionary is given then 
+        structures with the layout already in the dictionary derive from the structure
+        which defined that layout first and reuse its HDF5 types. Returns number of lines 
+        saved by reusing other structure, None if nothing is reused.
+        '''
 
         if 'external' in self.ds.tags:
             _log.debug("_genDs: skip dataset - external")
@@ -289,8 +383,24 @@ class DatasetCompound(object):
 
         hds = self
 
-        print(self._genH5TypeFunc("stored"), file=cpp)
-        print(self._genH5TypeFunc("native"), file=cpp)
+        stored = self._genH5TypeFunc("stored")
+        native = self._genH5TypeFunc("native")
+
+        # fixed-size datasets can be read for many events at once
+        batch = _fixedSize(self.ds)
+
+        # only fixed-size structures without external attributes can share layout
+        base = None
+        if layouts is not None and batch and not any(attr.external for attr in self.ds.attributes):
+            key = self._layoutKey(stored, native)
+            base = layouts.setdefault(key, self.ds.classNameNs())
+            if base == self.ds.classNameNs(): base = None
+
+        if base:
+            _log.debug("_genDs: dataset %s reuses layout of %s", self.ds.classNameNs(), base)
+        else:
+            print(stored, file=cpp)
+            print(native, file=cpp)
 
         # if schema contains single dataset and corresponding data type is a value type
         # then add conversion function from this dataset class to a data type
@@ -328,6 +438,25 @@ class DatasetCompound(object):
 
         # generate constructor and destructor
         print(_TEMPL('compound_dataset_ctor_dtor').render(locals()), file=cpp)
+        if batch: print(_TEMPL('compound_dataset_read_batch').render(locals()), file=cpp)
+
+        if base:
+            # type functions, their declarations and data members
+            return len(stored.splitlines()) + len(native.splitlines()) + 2 + \
+                sum(len(attr.ds_attr_decl()) for attr in self.attributes)
+
+    def _layoutKey(self, stored, native):
+        '''
+        Returns canonical representation of the structure layout: data members and 
+        definitions of HDF5 types with own names removed.
+        '''
+        ns = self.schema.nsName()
+        className = self.ds.className()
+        decls = [decl for attr in self.attributes for decl in attr.ds_attr_decl()]
+        code = '\n'.join([stored, native] + decls)
+        code = code.replace(ns + '::' + className, '{class}').replace(ns + '_' + className, '{class}')
+        # names in the code are relative to package namespace
+        return (self.pstype.parent.fullName('C++'), code)
 
     def _genH5TypeFunc(self, func):
         """
@@ -476,6 +605,14 @@ class DatasetRegular(object):
                 decls += [T("mutable boost::shared_ptr<$typename> m_ds_storage_${dsName};")(locals())]
         return decls
 
+    def fixed_size(self):
+        '''Returns true if dataset elements have fixed size and can be read or written in batches'''
+        return False
+
+    def ds_batch_decl(self):
+        '''Returns the list of public declarations for the schema class to use data from batch reads'''
+        return []
+
     def ds_decltype(self):
         '''Return declaration type of the dataset variable'''
         rank = self.ds.rank
@@ -497,6 +634,9 @@ class DatasetRegular(object):
                 return [_TEMPL('read_array_ds_basic_method').render(locals())]
             elif self.ds.type.value_type:
                 ds_struct = self._attr_dsname()
+                # with identical layout dataset data are used directly without copying
+                aschema = self.ds.h5schema()
+                zero_copy = _layoutCompatible(self.ds.type, aschema.datasets[0])
                 return [_TEMPL('read_array_ds_udt_method').render(locals())]
             else:
                 ds_struct = self._attr_dsname()
@@ -568,6 +708,7 @@ class DatasetRegular(object):
         '''Returns piece of code implementing dataset creation code'''
         ds = self.ds
         rank = ds.rank
+        create_args = _createArgs(ds)
 
         if ds.domain_for_method:
             arrayLen = self._getDomainMethodArrayLen(ds.domain_for_method, rank, context='make_ds_impl')
@@ -641,7 +782,7 @@ class DatasetRegular(object):
             ds_struct = self._attr_dsname()
             return _TEMPL('write_regular_ds').render(locals())
 
-    def genDs(self, inc, cpp):
+    def genDs(self, inc, cpp, layouts=None):
 
         pass
 
@@ -656,6 +797,10 @@ class SchemaType(object):
         self.pstypename = self.pstype.fullName('C++', psana_ns)
         self.psana_ns = psana_ns
         self.datasets = [_dsFactory(schema, ds, psana_ns) for ds in schema.datasets]
+        # datasets which are buffered by staged writer, all datasets are buffered together
+        # so that they have the same length, empty if any of the datasets is not fixed-size
+        self.staged = []
+        if all(ds.fixed_size() for ds in self.datasets): self.staged = self.datasets
         
 
 class SchemaValueType(SchemaType):
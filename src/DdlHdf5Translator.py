@@ -37,6 +37,7 @@ import copy
 #--------------------------------
 #  Imports of other modules --
 #--------------------------------
+from psddl.OutputFile import OutputFile
 from psddl.JinjaEnvironment import getJinjaEnvironment
 
 def getAliasAndGroupingTerm(s,endStrings):
@@ -385,8 +386,9 @@ class DdlHdf5Translator ( object ) :
             lns += '\n'
             type_filter_options += lns
         fname = os.path.join(self.packageDir, "data", "default_psana.cfg")
-        fout = file(fname,'w')
+        fout = OutputFile(fname)
         fout.write(tmpl.render(locals()))
+        fout.close()
         
     def writeTypeAliasesCpp(self, base_headers, aliasesOrderedForTemplates):
         class Entry(object):
@@ -400,18 +402,20 @@ class DdlHdf5Translator ( object ) :
             type_aliases.append(Entry(alias,typeList))
         tmpl = self.jiEnv.get_template('hdf5Translator.tmpl?type_aliases_cpp')
         fname = os.path.join(self.packageDir, 'src', 'TypeAliases.cpp')
-        fout = file(fname,'w')
+        fout = OutputFile(fname)
         fout.write(tmpl.render(locals()))
+        fout.close()
 
     def writeHdfWriterMapCpp(self, base_headers, namespaces, psanaTypes, elemDimPairs ):
         tmpl = self.jiEnv.get_template('hdf5Translator.tmpl?hdfwritermap_cpp')
         fname = os.path.join(self.packageDir, 'src', 'HdfWriterMap.cpp')
-        fout = file(fname,'w')
+        fout = OutputFile(fname)
         psana_types = list(psanaTypes.keys())
         psana_types.sort()
         # fix ups
         namespaces = [ns for ns in namespaces if ns not in ['Pds']]
         fout.write(tmpl.render(locals()))
+        fout.close()
 
     def writeEpicsHdfWriterDetails(self,epicsPackage):
       # ----- helper functions ------
@@ -475,12 +479,12 @@ class DdlHdf5Translator ( object ) :
                          'type_create_args': type_create_args})
       
       fname = os.path.join(self.packageDir, 'include', 'epics.ddl.h')
-      fout = file(fname,'w')
+      fout = OutputFile(fname)
       fout.write(epics_h_tmpl.render(locals()))
       fout.close()
 
       fname = os.path.join(self.packageDir, 'src', 'epics.ddl.cpp')
-      fout = file(fname,'w')
+      fout = OutputFile(fname)
       fout.write(epics_cpp_tmpl.render(locals()))
       fout.close()
 
@@ -494,8 +498,9 @@ class DdlHdf5Translator ( object ) :
           dbr_const = 'DBR_CTRL_' + pvVar.split('Ctrl')[1].upper()
         dbrTypes.append({'dbr_str':dbr_const, 'pv_type':epicsPv['name']})
       fname = os.path.join(self.packageDir, 'src', 'HdfWriterEpicsPvDispatch.cpp')
-      fout = file(fname,'w')
+      fout = OutputFile(fname)
       fout.write(dispatch_cpp_tmpl.render(locals()))
+      fout.close()
 #
 #  In case someone decides to run this module
 #
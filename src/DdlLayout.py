@@ -0,0 +1,243 @@
+#--------------------------------------------------------------------------
+# File and Version Information:
+#  $Id$
+#
+# Description:
+#  Module DdlLayout...
+#
+#------------------------------------------------------------------------
+
+"""Backend for psddlc which exports memory layout of types.
+
+Layout of every type (attribute offsets, sizes, shapes and dependencies on
+configuration objects) is written into JSON file, constant parts of the
+layout are also written as tables of constexpr values into C++ header, so
+that payloads can be parsed without psana/pdsdata classes. Offsets, sizes
+and dimensions which are not constant are given in JSON as DDL expressions.
+
+JSON file name is the name of the output file (-o or -O option) with .cpp
+extension replaced by .json, header file is given with -e or -E option.
+
+Backend-specific options:
+
+  top-package - specifies top-level namespace for the generated code, default is no top-level namespace
+
+This software was developed for the LCLS project.  If you use all or
+part of it, please give an appropriate acknowledgment.
+
+@version $Id$
+"""
+from __future__ import print_function
+
+
+#------------------------------
+#  Module's version from CVS --
+#------------------------------
+__version__ = "$Revision$"
+# $Source$
+
+#--------------------------------
+#  Imports of standard modules --
+#--------------------------------
+import sys
+import os
+import json
+from collections import OrderedDict
+
+#---------------------------------
+#  Imports of base class module --
+#---------------------------------
+
+#-----------------------------
+# Imports for other modules --
+#-----------------------------
+from psddl.OutputFile import OutputFile
+from psddl.ExprVal import ExprVal
+from psddl.Template import Template as T
+
+#----------------------------------
+# Local non-exported definitions --
+#----------------------------------
+
+def _codesubs(expr):
+    expr = expr.replace('{xtc-config}', '@config')
+    expr = expr.replace('{type}.', '@class.')
+    expr = expr.replace('{self}.', "@self.")
+    return expr
+
+def _value(expr, ns=None):
+    '''Returns integer value of expression or expression as DDL string'''
+    val = ExprVal(expr, ns)
+    if isinstance(val.value, int): return val.value
+    return _codesubs(str(val))
+
+def _hasconfig(expr):
+    return isinstance(expr, str) and '@config' in expr
+
+def _cint(val):
+    '''Returns C++ constant for a value, -1 for expressions'''
+    return str(val) if isinstance(val, int) else '-1'
+
+#------------------------
+# Exported definitions --
+#------------------------
+
+#---------------------
+#  Class definition --
+#---------------------
+class DdlLayout ( object ) :
+
+    @staticmethod
+    def backendOptions():
+        """ Returns the list of options supported by this backend, returned value is
+        either None or a list of triplets (name, type, description)"""
+        return None
+
+    #----------------
+    #  Constructor --
+    #----------------
+    def __init__ ( self, backend_options, log ) :
+        '''Constructor
+
+           @param backend_options  dictionary of options passed to backend
+           @param log              message logger instance
+        '''
+        self.incname = backend_options['global:header']
+        self.jsonname = backend_options['global:source']
+        if self.jsonname.endswith('.cpp'): self.jsonname = self.jsonname[:-4] + '.json'
+        self.top_pkg = backend_options.get('global:top-package')
+
+        self._log = log
+
+        #include guard
+        g = os.path.split(self.incname)[1]
+        if self.top_pkg: g = self.top_pkg + '_' + g
+        self.guard = g.replace('.', '_').upper()
+
+    #-------------------
+    #  Public methods --
+    #-------------------
+
+    def parseTree ( self, model ) :
+
+        # open output files
+        self.inc = OutputFile(self.incname)
+
+        print("#ifndef", self.guard, file=self.inc)
+        print("#define", self.guard, "1", file=self.inc)
+        print("\n// *** Do not edit this file, it is auto-generated ***\n", file=self.inc)
+        print("#include <stdint.h>\n", file=self.inc)
+        if self.top_pkg: print(T("namespace $top_pkg {")[self], file=self.inc)
+
+        # loop over packages in the model
+        types = []
+        for pkg in model.packages() :
+            if not pkg.included :
+                self._log.debug("parseTree: package=%s", repr(pkg))
+                for type in pkg.allTypes():
+                    if type.included: continue
+                    layout = self._typeLayout(type)
+                    types.append(layout)
+                    self._genTables(type, layout)
+
+        if self.top_pkg: print(T("} // namespace $top_pkg")[self], file=self.inc)
+        print("\n#endif //", self.guard, file=self.inc)
+        self.inc.close()
+
+        out = OutputFile(self.jsonname)
+        json.dump(OrderedDict(types=types), out, indent=2, separators=(',', ': '))
+        print(file=out)
+        out.close()
+
+    #--------------------
+    #  Private methods --
+    #--------------------
+
+    def _typeLayout(self, type):
+        '''Returns dictionary with type layout'''
+
+        self._log.debug("_typeLayout: type=%s", repr(type))
+
+        layout = OrderedDict()
+        layout['name'] = type.fullName()
+        layout['cpp_name'] = type.fullName('C++', self.top_pkg)
+        layout['type_id'] = type.type_id
+        layout['version'] = type.version
+        layout['value_type'] = bool(type.value_type)
+        layout['pack'] = type.pack
+        layout['align'] = type.align
+        layout['size'] = _value(type.size)
+        layout['config'] = [cfg.fullName() for cfg in type.xtcConfig]
+
+        attrs = []
+        for attr in type.attributes():
+
+            offset = _value(attr.offset)
+            shape = [_value(dim, attr.shape.ns) for dim in attr.shape.dims] if attr.shape else None
+            size = _value(attr.sizeBytes())
+
+            adesc = OrderedDict()
+            adesc['name'] = attr.name
+            adesc['accessor'] = attr.accessor.name if attr.accessor else None
+            adesc['type'] = attr.type.fullName()
+            adesc['stor_type'] = attr.stor_type.fullName()
+            adesc['basic'] = bool(attr.stor_type.basic)
+            adesc['offset'] = offset
+            adesc['elem_size'] = _value(attr.stor_type.size)
+            adesc['shape'] = shape
+            adesc['size'] = size
+            adesc['config_dependent'] = any(_hasconfig(val) for val in [offset, size] + (shape or []))
+            adesc['bitfields'] = [OrderedDict([('name', bf.name),
+                                               ('accessor', bf.accessor.name if bf.accessor else None),
+                                               ('type', bf.type.fullName()),
+                                               ('bit_offset', bf.offset),
+                                               ('bits', bf.size)]) for bf in attr.bitfields]
+            attrs.append(adesc)
+
+        layout['attributes'] = attrs
+        return layout
+
+    def _genTables(self, type, layout):
+        '''Generate constexpr tables for a type'''
+
+        attrs = layout['attributes']
+
+        def count(attr):
+            res = 1
+            for dim in attr['shape'] or []:
+                if not isinstance(dim, int): return None
+                res *= dim
+            return res
+
+        namespaces = type.parent.fullName('C++').split('::')
+        for ns in namespaces: print(T("namespace $ns {")(ns=ns), file=self.inc)
+        print(T("namespace ${name}_layout {")(name=type.name), file=self.inc)
+        print("  /// Total size in bytes, -1 if size depends on data or configuration", file=self.inc)
+        print(T("  constexpr int32_t size = $size;")(size=_cint(layout['size'])), file=self.inc)
+        print("  /// Number of attributes", file=self.inc)
+        print(T("  constexpr unsigned nattrs = $n;")(n=len(attrs)), file=self.inc)
+        if attrs:
+            names = ', '.join('"%s"' % attr['name'] for attr in attrs)
+            offsets = ', '.join(_cint(attr['offset']) for attr in attrs)
+            sizes = ', '.join(_cint(attr['elem_size']) for attr in attrs)
+            counts = ', '.join(_cint(count(attr)) for attr in attrs)
+            print("  /// Attribute names in order of declaration", file=self.inc)
+            print(T("  constexpr const char* names[nattrs] = {$names};")(names=names), file=self.inc)
+            print("  /// Attribute offsets in bytes, -1 if offset depends on data or configuration", file=self.inc)
+            print(T("  constexpr int32_t offsets[nattrs] = {$offsets};")(offsets=offsets), file=self.inc)
+            print("  /// Size of one attribute element in bytes, -1 if it is not known", file=self.inc)
+            print(T("  constexpr int32_t elem_sizes[nattrs] = {$sizes};")(sizes=sizes), file=self.inc)
+            print("  /// Number of elements in attribute, 1 for non-arrays, -1 if it depends on data or configuration", file=self.inc)
+            print(T("  constexpr int32_t counts[nattrs] = {$counts};")(counts=counts), file=self.inc)
+        print(T("} // namespace ${name}_layout")(name=type.name), file=self.inc)
+        for ns in reversed(namespaces): print(T("} // namespace $ns")(ns=ns), file=self.inc)
+        print(file=self.inc)
+
+#
+#  In case someone decides to run this module
+#
+if __name__ == "__main__" :
+
+    # In principle we can try to run test suite for this module,
+    # have to think about it later. Right now just abort.
+    sys.exit ( "Module is not supposed to be run as main module" )
@@ -41,6 +41,7 @@ import types
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.JinjaEnvironment import getJinjaEnvironment
 from psddl.Attribute import Attribute
 from psddl.Enum import Enum
@@ -52,11 +53,9 @@ from psddl.Template import Template as T
 # Local non-exported definitions --
 #----------------------------------
 
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('pds2psana.tmpl?'+template)
+    return getJinjaEnvironment().get_template('pds2psana.tmpl?'+template)
 
 def _interpolate(expr):
     expr = expr.replace('{xtc-config}.', 'cfgPtr->')
@@ -132,8 +131,8 @@ class DdlPds2Psana ( object ) :
     def parseTree ( self, model ) :
         
         # open output files
-        self.inc = file(self.incname, 'w')
-        self.cpp = file(self.cppname, 'w')
+        self.inc = OutputFile(self.incname)
+        self.cpp = OutputFile(self.cppname)
 
         # include guard to header
         print("#ifndef", self.guard, file=self.inc) 
@@ -150,6 +149,8 @@ class DdlPds2Psana ( object ) :
         print(T("#include \"$inc\"\n")(locals()), file=self.cpp)
         print("#include <cstddef>\n", file=self.cpp)
         print("#include <stdexcept>\n", file=self.cpp)
+        print("#include <boost/make_shared.hpp>\n", file=self.cpp)
+        print("#include <boost/static_assert.hpp>\n", file=self.cpp)
 
         # headers for psana and pdsdata includes
         inc = os.path.join(self.psana_inc, os.path.basename(self.incname))
@@ -312,6 +313,21 @@ class DdlPds2Psana ( object ) :
         print(T("  return $psana_ns::$typename($ctor_args);")\
             (locals(), psana_ns=self.psana_ns), file=self.cpp)
         print("}\n", file=self.cpp)
+
+        # same conversion which constructs psana object directly in a shared object, 
+        # used by dispatch code to avoid extra copy, make_shared is limited to 9 arguments
+        print(T("boost::shared_ptr<$psana_ns::$typename> pds_to_psana_shared(const $pdsdata_ns::$typename& pds);\n")\
+            (self.__dict__, typename=typename), file=self.inc)
+
+        print(T("boost::shared_ptr<$psana_ns::$typename> pds_to_psana_shared(const $pdsdata_ns::$typename& pds)\n{")\
+            (self.__dict__, typename=typename), file=self.cpp)
+        if len(ctor.args) <= 9:
+            print(T("  return boost::make_shared<$psana_ns::$typename>($ctor_args);")\
+                (locals(), psana_ns=self.psana_ns), file=self.cpp)
+        else:
+            print(T("  return boost::shared_ptr<$psana_ns::$typename>(new $psana_ns::$typename($ctor_args));")\
+                (locals(), psana_ns=self.psana_ns), file=self.cpp)
+        print("}\n", file=self.cpp)
         
 
     def _genAbsType(self, type):
@@ -518,7 +534,7 @@ class DdlPds2Psana ( object ) :
         elif attr.type.value_type:
             
             # for value types we return ndarray which needs contiguous memory
-            return [T("ndarray<$type, $rank> ${attr}_ndarray_storage_;")(type=psana_type, attr=attr.name, rank=len(attr.shape.dims))]
+            return [T("ndarray<const $type, $rank> ${attr}_ndarray_storage_;")(type=psana_type, attr=attr.name, rank=len(attr.shape.dims))]
 
         else :
 
@@ -668,6 +684,13 @@ class DdlPds2Psana ( object ) :
         if not attr.type.external:
             cvt = attr.type.parent.fullName('C++', self.top_pkg) + '::pds_to_psana'
 
+        # external types are the same type in pdsdata and psana, ndarray can 
+        # share XTC data; value types with identical memory layout in pdsdata 
+        # and psana classes can share XTC data too with a cast to psana type, 
+        # all other types need element-wise conversion
+        alias = pdstypename == psanatypename
+        cast = not alias and bool(attr.type.naturalAlign())
+
         # ndarray initialization
         return [_TEMPL('attr_init_ndarray').render(locals())]
 
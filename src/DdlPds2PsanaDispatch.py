@@ -42,6 +42,7 @@ import collections
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.Package import Package
 from psddl.Type import Type
 from psddl.Template import Template as T
@@ -127,11 +128,9 @@ def _proxyClass(type, psana_type, final_type, xtc_type, config_type=None):
     else:
             return 'EvtProxyCfg<{0}, {1}, {2}, {3}>'.format(psana_type, final_type, xtc_type, config_type)
 
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('pds2psana_dispatch.tmpl?'+template)
+    return getJinjaEnvironment().get_template('pds2psana_dispatch.tmpl?'+template)
 
 #------------------------
 # Exported definitions --
@@ -184,8 +183,8 @@ class DdlPds2PsanaDispatch ( object ) :
     def parseTree ( self, model ) :
         
         # open output files
-        self.inc = file(self.incname, 'w')
-        self.cpp = file(self.cppname, 'w')
+        self.inc = OutputFile(self.incname)
+        self.cpp = OutputFile(self.cppname)
 
         # loop over packages and types in the model
         for ns in model.namespaces() :
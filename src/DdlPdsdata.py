@@ -41,6 +41,7 @@ import types
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.JinjaEnvironment import getJinjaEnvironment
 from psddl.CppTypeCodegen import CppTypeCodegen
 from psddl.Package import Package
@@ -50,11 +51,9 @@ from psddl.Type import Type
 # Local non-exported definitions --
 #----------------------------------
 
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('cppcodegen.tmpl?'+template)
+    return getJinjaEnvironment().get_template('cppcodegen.tmpl?'+template)
 
 #------------------------
 # Exported definitions --
@@ -99,8 +98,8 @@ class DdlPdsdata ( object ) :
     def parseTree ( self, model ) :
         
         # open output files
-        self.inc = file(self.incname, 'w')
-        self.cpp = file(self.cppname, 'w')
+        self.inc = OutputFile(self.incname)
+        self.cpp = OutputFile(self.cppname)
         
         # include guard to header
         print("#ifndef", self.guard, file=self.inc) 
@@ -41,6 +41,7 @@ import cgi
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.Constant import Constant
 from psddl.Package import Package
 from psddl.Type import Type
@@ -260,7 +261,7 @@ class DdlPsanaDoc ( object ) :
     def parseTree ( self, model ) :
         
         # open output file
-        out = file(os.path.join(self.dir, "index.html"), "w")
+        out = OutputFile(os.path.join(self.dir, "index.html"))
         self._htmlHeader(out, "Psana Data Interfaces Reference")
         print('<h1>Psana Data Interfaces Reference</h1>', file=out)
         
@@ -281,7 +282,7 @@ class DdlPsanaDoc ( object ) :
         out.close()
         
         # write CSS
-        out = file(os.path.join(self.dir, _css_file), "w")
+        out = OutputFile(os.path.join(self.dir, _css_file))
         out.write(_css)
         out.close()
 
@@ -291,7 +292,7 @@ class DdlPsanaDoc ( object ) :
         filename = self._pkgFileName(pkg)
 
         # open output file
-        out = file(os.path.join(self.dir, filename), "w")
+        out = OutputFile(os.path.join(self.dir, filename))
         self._htmlHeader(out, T("Package $name Reference")(name=_esc(pkgname)))
         print(T('<h1>Package $name Reference</h1>')(name=_esc(pkgname)), file=out)
 
@@ -321,7 +322,7 @@ class DdlPsanaDoc ( object ) :
         filename = self._typeFileName(type)
 
         # open output file
-        out = file(os.path.join(self.dir, filename), "w")
+        out = OutputFile(os.path.join(self.dir, filename))
         self._htmlHeader(out, T("Class $name Reference")(name=_esc(typename)))
         print(T('<h1>Class $name Reference</h1>')(name=_esc(typename)), file=out)
 
@@ -41,6 +41,7 @@ import types
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.CppTypeCodegen import CppTypeCodegen
 from psddl.Package import Package
 from psddl.Type import Type
@@ -51,11 +52,9 @@ from psddl.JinjaEnvironment import getJinjaEnvironment
 # Local non-exported definitions --
 #----------------------------------
 
-# jinja environment
-_jenv = getJinjaEnvironment()
-
+# jinja environment is created on first use
 def _TEMPL(template):
-    return _jenv.get_template('cppcodegen.tmpl?'+template)
+    return getJinjaEnvironment().get_template('cppcodegen.tmpl?'+template)
 
 #------------------------
 # Exported definitions --
@@ -100,8 +99,8 @@ class DdlPsanaInterfaces ( object ) :
     def parseTree ( self, model ) :
         
         # open output files
-        self.inc = file(self.incname, 'w')
-        self.cpp = file(self.cppname, 'w')
+        self.inc = OutputFile(self.incname)
+        self.cpp = OutputFile(self.cppname)
 
         # include guard to header
         print("#ifndef", self.guard, file=self.inc) 
@@ -116,6 +115,8 @@ class DdlPsanaInterfaces ( object ) :
         print("#include <iosfwd>", file=self.inc)
         print("#include <cstddef>", file=self.cpp)
         print("#include <cstring>", file=self.inc)
+        print("#include <cstddef>", file=self.inc)
+        print("#include <boost/static_assert.hpp>", file=self.inc)
 
         print("#include \"ndarray/ndarray.h\"", file=self.inc)
         print("#include \"pdsdata/xtc/TypeId.hh\"", file=self.inc)
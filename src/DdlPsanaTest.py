@@ -38,6 +38,7 @@ import os
 #--------------------------------
 #  Imports of other modules --
 #--------------------------------
+from psddl.OutputFile import OutputFile
 from psddl.JinjaEnvironment import getJinjaEnvironment
 from collections import defaultdict
 import psddl
@@ -71,7 +72,7 @@ class DdlPsanaTest ( object ) :
   #-------------------
   def parseTree ( self, model ) :
     psddl_dump_py_fname = os.path.join(self.packageDir, 'src', 'psddl_dump.py')
-    psddl_dump_py = file(psddl_dump_py_fname,'w')
+    psddl_dump_py = OutputFile(psddl_dump_py_fname)
 
     xtcTypes = getXtcTypes(model)
     xtc_dispatch_list = makePythonXtcDispatchList(xtcTypes)
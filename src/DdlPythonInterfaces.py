@@ -9,6 +9,14 @@
 
 """DDL parser which generates psana C++ interfaces.
 
+Backend-specific options:
+
+  psana-inc - specifies include directory for psana header files
+  psana-ns - specifies top-level namespace for Psana interfaces
+  gather - if present then generate static gather() method for XTC types which
+           collects scalar and fixed-shape array attributes of many objects
+           into NumPy arrays in a single call
+
 This software was developed for the SIT project.  If you use all or 
 part of it, please give an appropriate acknowledgment.
 
@@ -43,6 +51,7 @@ import re
 #-----------------------------
 # Imports for other modules --
 #-----------------------------
+from psddl.OutputFile import OutputFile
 from psddl.Attribute import Attribute
 from psddl.ExprVal import ExprVal
 from psddl.Method import Method
@@ -93,6 +102,139 @@ def _escape_and_quote(comment):
     comment = comment.replace('\n','\\n')
     comment = comment.replace('"','\\"')
     return '"%s"'%comment
+
+# NumPy type codes for basic types
+_numpyTypes = dict(char='S1', int8_t='i1', uint8_t='u1', int16_t='i2', uint16_t='u2', 
+                   int32_t='i4', uint32_t='u4', int64_t='i8', uint64_t='u8', 
+                   float='f4', double='f8')
+
+def _intval(expr, ns=None):
+    '''Return integer value of expression or None if it is not a constant'''
+    val = ExprVal(expr, ns).value
+    if isinstance(val, int): return val
+
+def _numpyDtype(type):
+    '''
+    Returns NumPy dtype specification for a value type (Python dict literal with
+    names, formats, offsets and itemsize) or None if arrays of this type cannot be
+    viewed as NumPy structured arrays. Psana class of a value type has one member
+    per attribute, it is used only if the type has natural layout (see
+    Type.naturalAlign()) and all members are basic types. Attributes without
+    accessors (padding) do not appear in dtype.
+    '''
+    if not type.naturalAlign(): return None
+
+    names, formats, offsets = [], [], []
+    for attr in type.attributes():
+
+        atype = attr.stor_type
+        if attr.bitfields or atype.name not in _numpyTypes: return None
+
+        shape = []
+        if attr.shape:
+            shape = [_intval(dim, attr.shape.ns) for dim in attr.shape.dims]
+        fmt = _numpyTypes[atype.name]
+        if atype.name == 'char' and shape:
+            # last dimension of char array makes a string
+            fmt = 'S%d' % shape.pop()
+        if shape:
+            fmt = str(tuple(shape)) + fmt
+
+        if attr.accessor:
+            names.append(attr.accessor.name)
+            formats.append(fmt)
+            offsets.append(_intval(attr.offset))
+
+    if not names: return None
+
+    return "{'names': %r, 'formats': %r, 'offsets': %r, 'itemsize': %d}" % (names, formats, offsets, _intval(type.size))
+
+# C++ helpers for NumPy structured arrays, included in every package namespace
+_structCvtCode = """\
+namespace {
+template <typename T>
+bool has_to_python_cvt() {
+  const converter::registration* reg = converter::registry::query(type_id<T>());
+  return reg and reg->m_to_python;
+}
+
+template <typename T>
+struct numpy_struct_dtype {
+  static PyObject* dtype;
+};
+template <typename T> PyObject* numpy_struct_dtype<T>::dtype = 0;
+
+// Converts ndarray of value-type objects into NumPy structured array, result is a view
+// of the ndarray data, shared pointer to data (and its owner) is kept by NumPy array
+template <typename T, unsigned Rank>
+struct ndarray_to_numpy_struct {
+  static PyObject* convert(const ndarray<T, Rank>& arr) {
+    typedef ndarray<const uint8_t, Rank+1> Bytes;
+    typename Bytes::shape_t shape[Rank+1];
+    std::copy(arr.shape(), arr.shape()+Rank, shape);
+    shape[Rank] = sizeof(T);
+    boost::shared_ptr<const uint8_t> data(arr.data_ptr(), reinterpret_cast<const uint8_t*>(arr.data()));
+    object bytes(Bytes(data, shape));
+    object dtype(handle<>(borrowed(numpy_struct_dtype<T>::dtype)));
+    return incref(bytes.attr("view")(dtype).attr("squeeze")(-1).ptr());
+  }
+};
+
+// Registers structured array converter for ndarray<T, Rank>, falls back to list
+// converter if dtype does not match C++ size of T
+template <typename T, unsigned Rank>
+void register_ndarray_to_numpy_struct_cvt(const char* dtypeSpec) {
+  if (has_to_python_cvt<ndarray<T, Rank> >()) return;
+  if (not numpy_struct_dtype<T>::dtype) {
+    object spec = import("ast").attr("literal_eval")(dtypeSpec);
+    object dtype = import("numpy").attr("dtype")(spec);
+    if (extract<size_t>(dtype.attr("itemsize"))() != sizeof(T)) {
+      detail::register_ndarray_to_list_cvt<T>();
+      return;
+    }
+    numpy_struct_dtype<T>::dtype = incref(dtype.ptr());
+  }
+  if (not has_to_python_cvt<ndarray<const uint8_t, Rank+1> >()) {
+    detail::register_ndarray_to_numpy_cvt<const uint8_t, Rank+1>();
+  }
+  to_python_converter<ndarray<T, Rank>, ndarray_to_numpy_struct<T, Rank> >();
+}
+} // namespace
+"""
+
+# C++ helpers for gather() methods, included in every package namespace
+_gatherCode = """\
+namespace {
+// Writable access to the data of C-contiguous NumPy array with elements of type T,
+// each row of array holds rowSize elements which belong to one object
+template <typename T>
+class GatherColumn {
+public:
+  GatherColumn(const object& arr, size_t rowSize) : m_rowSize(rowSize) {
+    if (PyObject_GetBuffer(arr.ptr(), &m_buf, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) throw_error_already_set();
+  }
+  ~GatherColumn() { PyBuffer_Release(&m_buf); }
+
+  T& operator[](size_t i) { return static_cast<T*>(m_buf.buf)[i]; }
+
+  template <unsigned Rank>
+  void fill(size_t i, const ndarray<const T, Rank>& arr) {
+    if (arr.size() != m_rowSize) {
+      PyErr_SetString(PyExc_ValueError, "gather: array size differs from declared shape");
+      throw_error_already_set();
+    }
+    std::copy(arr.begin(), arr.end(), static_cast<T*>(m_buf.buf) + i*m_rowSize);
+  }
+
+private:
+  GatherColumn(const GatherColumn&);
+  GatherColumn& operator=(const GatherColumn&);
+
+  Py_buffer m_buf;
+  size_t m_rowSize;
+};
+} // namespace
+"""
 #------------------------
 # Exported definitions --
 #------------------------
@@ -109,6 +251,7 @@ class DdlPythonInterfaces ( object ) :
         return [
             ('psana-inc', 'PATH', "directory for Psana includes, default: psddl_psana"),
             ('psana-ns', 'STRING', "namespace for Psana types, default: Psana"),
+            ('gather', '', "if specified then generate gather() methods for XTC types"),
             ]
 
     #----------------
@@ -126,7 +269,9 @@ class DdlPythonInterfaces ( object ) :
         self.top_pkg = backend_options.get('global:top-package')
         self.psana_inc = backend_options.get('psana-inc', "psddl_psana")
         self.psana_ns = backend_options.get('psana-ns', "Psana")
+        self.gather = 'gather' in backend_options
         self.generics = {}
+        self.dtypes = {}     # psana type name -> NumPy dtype spec or None
         
         self._log = log
 
@@ -137,12 +282,13 @@ class DdlPythonInterfaces ( object ) :
     def parseTree ( self, model ) :
         
         # open output files
-        self.cpp = file(self.cppname, 'w')
+        self.cpp = OutputFile(self.cppname)
 
         warning = "/* Do not edit this file, as it is auto-generated */\n"
         print(warning, file=self.cpp)
 
         # add necessary includes to include file
+        print('#include <algorithm>', file=self.cpp)
         print('#include <boost/python.hpp>', file=self.cpp)
         print('#include <boost/make_shared.hpp>', file=self.cpp)
         print('#include "ndarray/ndarray.h"', file=self.cpp)
@@ -232,7 +378,16 @@ class DdlPythonInterfaces ( object ) :
         print('PyObject* method_shape(const T *x) {', file=self.cpp)
         print('  return detail::vintToList((x->*MF)());\n}', file=self.cpp)
         print('} // namespace\n', file=self.cpp)
+        print(_structCvtCode, file=self.cpp)
+        if self.gather: print(_gatherCode, file=self.cpp)
 
+        # bulk accessors for all types
+        print('namespace {', file=self.cpp)
+        for ns in self.pkg.namespaces() :
+            if isinstance(ns, Type) and not ns.included:
+                self._genBulkAccessor(ns)
+                if self.gather: self._genGather(ns)
+        print('} // namespace\n', file=self.cpp)
 
         print("void createWrappers(PyObject* module) {", file=self.cpp)
 
@@ -291,7 +446,10 @@ class DdlPythonInterfaces ( object ) :
 
 
         for type, ndim in ndconverters:
-            if ndim > 0:
+            dtype = self.dtypes.get(type)
+            if dtype:
+                print(T('  register_ndarray_to_numpy_struct_cvt<const $type, $ndim>("$dtype");')(locals()), file=self.cpp)
+            elif ndim > 0:
                 print(T('  detail::register_ndarray_to_numpy_cvt<const $type, $ndim>();')(locals()), file=self.cpp)
             else:
                 print(T('  detail::register_ndarray_to_list_cvt<const $type>();')(locals()), file=self.cpp)
@@ -357,6 +515,14 @@ class DdlPythonInterfaces ( object ) :
         for attr in type.attributes() :
             self._genAttrShapeAndListDecl(type, attr, wrapped)
 
+        # bulk accessor for all scalar attributes
+        if self._bulkMethods(type):
+            self._genMethodDef(type, '', 'as_dict', 'Returns dictionary with values of all scalar attributes')
+        if self.gather and self._gatherColumns(type):
+            self._genMethodDef(type, '', 'gather', 'Takes sequence of objects, returns dictionary of NumPy arrays '
+                               'with values of scalar and fixed-shape array attributes, first axis is object index')
+            print('    .staticmethod("gather")', file=self.cpp)
+
         # close class declaration
         print('  ;', file=self.cpp)
 
@@ -433,9 +599,14 @@ class DdlPythonInterfaces ( object ) :
 
         elif method.type.value_type:
 
-            # wrapped method returns ndarray and we should convert it into regular Python list
+            # wrapped method returns ndarray, if type has fixed layout it is converted 
+            # into NumPy structured array, otherwise into regular Python list
             ctype = method.type.fullName('C++', self.psana_ns)
-            ndconverters.add((ctype, -1))
+            if ctype not in self.dtypes: self.dtypes[ctype] = _numpyDtype(method.type)
+            if self.dtypes[ctype]:
+                ndconverters.add((ctype, method.rank))
+            else:
+                ndconverters.add((ctype, -1))
 
         else:
 
@@ -450,11 +621,38 @@ class DdlPythonInterfaces ( object ) :
     def _genMethodDef(self, type, bclass, method_name, method_comment, policy=''):
 
         policy = ', ' + policy if policy else ''
+        func = bclass + '::' + method_name if bclass else type.name + '_' + method_name
         if method_comment:
             method_comment = _escape_and_quote(method_comment)
-            print(T('    .def("$method_name", &$bclass::$method_name$policy,$method_comment)')(locals()), file=self.cpp)
+            print(T('    .def("$method_name", &$func$policy,$method_comment)')(locals()), file=self.cpp)
         else:
-            print(T('    .def("$method_name", &$bclass::$method_name$policy)')(locals()), file=self.cpp)
+            print(T('    .def("$method_name", &$func$policy)')(locals()), file=self.cpp)
+
+    def _bulkMethods(self, type):
+        """Returns the list of public accessor methods of attributes and bitfields 
+        which return scalars of basic types or strings"""
+        methods = []
+        for method in type.methods():
+            if method.access != "public" or method.args or method.name == '_sizeof': continue
+            if method.attribute is None and method.bitfield is None: continue
+            if method.type is None or not method.type.basic: continue
+            if method.rank == 0 or (method.rank == 1 and method.type.name == 'char'):
+                methods.append(method)
+        return methods
+
+    def _genBulkAccessor(self, type):
+        """Generate function which returns all scalar attributes of an object 
+        in a dictionary, one call from Python instead of a call per attribute"""
+
+        methods = self._bulkMethods(type)
+        if not methods: return
+
+        wrapped = type.fullName('C++', self.psana_ns)
+        print(T('object ${name}_as_dict(const $wrapped& obj) {')(name=type.name, wrapped=wrapped), file=self.cpp)
+        print('  dict res;', file=self.cpp)
+        for method in methods:
+            print(T('  res["$name"] = obj.$name();')[method], file=self.cpp)
+        print('  return res;\n}', file=self.cpp)
 
     def isString(self, o):
         return type(o) == type("")
@@ -470,6 +668,58 @@ class DdlPythonInterfaces ( object ) :
         shape_method = attr.shape_method
         print(T('    .def("$shape_method", &method_shape<$bclass, &$bclass::$shape_method>)')(locals()), file=self.cpp)
 
+    def _gatherColumns(self, type):
+        """Returns the list of columns for gather() method, one column per public 
+        accessor of scalar or fixed-shape array of basic type, each column is 
+        a tuple (method, C++ type, NumPy type code, shape)"""
+        if not type.type_id: return []
+        columns = []
+        for method in type.methods():
+            if method.access != "public" or method.args: continue
+            if method.attribute is None and method.bitfield is None: continue
+            if method.type is None or not method.type.basic: continue
+            atype = method.type.base if isinstance(method.type, Enum) else method.type
+            if atype.name == 'char' or atype.name not in _numpyTypes: continue
+            shape = []
+            if method.rank:
+                if not method.attribute or not method.attribute.shape: continue
+                shape = [_intval(dim, method.attribute.shape.ns) for dim in method.attribute.shape.dims]
+                if None in shape: continue
+            columns.append((method, atype.fullName('C++', self.psana_ns), _numpyTypes[atype.name], shape))
+        return columns
+
+    def _genGather(self, type):
+        """Generate function which collects attributes of a sequence of objects 
+        into NumPy arrays, one loop in C++ instead of a call per object and attribute"""
+
+        columns = self._gatherColumns(type)
+        if not columns: return
+
+        wrapped = type.fullName('C++', self.psana_ns)
+        print(T('object ${name}_gather(const object& objs) {')(name=type.name), file=self.cpp)
+        print('  const size_t n = len(objs);', file=self.cpp)
+        print('  object numpy = import("numpy");', file=self.cpp)
+        for method, ctype, code, shape in columns:
+            dims = ', '.join(['n'] + [str(d) for d in shape])
+            print(T('  object col_$name = numpy.attr("empty")(make_tuple($dims), "$code");')(name=method.name, dims=dims, code=code), file=self.cpp)
+        print('  {', file=self.cpp)
+        for method, ctype, code, shape in columns:
+            size = 1
+            for dim in shape: size *= dim
+            print(T('    GatherColumn<$ctype> c_$name(col_$name, $size);')(ctype=ctype, name=method.name, size=size), file=self.cpp)
+        print('    for (size_t i = 0; i != n; ++ i) {', file=self.cpp)
+        print(T('      const $wrapped& obj = extract<const $wrapped&>(objs[i]);')(wrapped=wrapped), file=self.cpp)
+        for method, ctype, code, shape in columns:
+            if shape:
+                print(T('      c_$name.fill(i, obj.$name());')[method], file=self.cpp)
+            else:
+                print(T('      c_$name[i] = obj.$name();')[method], file=self.cpp)
+        print('    }\n  }', file=self.cpp)
+        print('  dict res;', file=self.cpp)
+        for method, ctype, code, shape in columns:
+            print(T('  res["$name"] = col_$name;')[method], file=self.cpp)
+        print('  return res;\n}', file=self.cpp)
+
 #
 #  In case someone decides to run this module
 #
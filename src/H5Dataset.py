@@ -96,6 +96,22 @@ class H5Dataset ( object ) :
 
         return method
 
+    @property
+    def chunk(self):
+        '''Chunk size in elements from chunk() tag, None if dataset uses chunk policy'''
+        return self.tags.get('chunk')
+
+    @property
+    def deflate(self):
+        '''Compression level from deflate() tag (-1 for no compression), None if not specified'''
+        return self.tags.get('deflate')
+
+    @property
+    def shuffle(self):
+        '''Shuffle flag from shuffle tag, None if not specified'''
+        if 'shuffle' not in self.tags: return None
+        return self.tags['shuffle'] in (None, 1)
+
     @property
     def method(self):
         if self.attributes: return None
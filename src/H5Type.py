@@ -28,6 +28,7 @@ __version__ = "$Revision$"
 #  Imports of standard modules --
 #--------------------------------
 import sys
+import copy
 import logging
 
 #---------------------------------
@@ -94,8 +95,32 @@ class H5Type ( object ) :
         
         return "<H5Type(name=%s, version=%s, datasets=%s)>" % (self.name, self.version, self.datasets)
 
+    def withTags(self, tags):
+        """Returns light-weight copy of this schema with additional tags, 
+        datasets and enum map are shared with this schema"""
+        schema = copy.copy(self)
+        schema.tags = self.tags.copy()
+        schema.tags.update(tags)
+        return schema
+
+    @staticmethod
+    def defaultSchema(type, tags=None):
+        """Returns default schema for a type. Schema is generated from the type 
+        itself on first call and cached in the type object, so that repeated calls 
+        for the same type within one backend (e.g. for sub-types and in schema 
+        fixup) reuse it. If tags are given then result is a copy of cached schema 
+        (made with withTags()) with the tags merged."""
+
+        schema = type.h5defaultSchema
+        if schema is None:
+            schema = type.h5defaultSchema = H5Type._makeDefaultSchema(type)
+        else:
+            _log.debug("defaultSchema: cached schema for type=%s", type)
+        if tags: schema = schema.withTags(tags)
+        return schema
+
     @staticmethod
-    def defaultSchema(type):
+    def _makeDefaultSchema(type):
         """Generate default schema for a types from type itself"""
 
         _log.debug("_defaultSchema: type=%s", type)
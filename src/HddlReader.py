@@ -54,6 +54,7 @@ from psddl.H5Dataset import H5Dataset
 from psddl.H5Attribute import H5Attribute
 from psddl.HddlYacc import HddlYacc
 from psddl.HddlYacc import QID
+from psddl.ModelCache import ModelCache, dataDigest, findInclude
 
 #----------------------------------
 # Local non-exported definitions --
@@ -148,12 +149,6 @@ def _constExprToString(decl):
             op = '>>'
         return _constExprToString(lhs) + op + _constExprToString(rhs)
 
-def _cmpFiles(f1, f2):
-    """Brute force file compare"""
-    c1 = file(f1).read()
-    c2 = file(f2).read()
-    return c1 == c2
-
 def _lineno(decl):
     ''' Return line number for a declaration '''
     return decl['pos'][0][0]
@@ -183,20 +178,38 @@ class HddlReader ( object ) :
     #----------------
     #  Constructor --
     #----------------
-    def __init__ ( self, ddlfiles, inc_dir, parseDevel=False ) :
+    def __init__ ( self, ddlfiles, inc_dir, parseDevel=False, cacheDir=None ) :
         self.files = ddlfiles
         self.inc_dir = inc_dir
         self.parseDevelTypes = parseDevel
 
+        # directory for cached models, if None then cache is not used
+        self.cacheDir = cacheDir
+
         # list of all files already processed (or being processed)
         # each item is a tuple (name, data)
         self.processed = []
+
+        # digests of the contents of processed files, maps digest to file name
+        self._processedDigests = {}
+
+        # data and digest of every file read so far, indexed by file identity
+        self._fileData = {}
+
+        # digests of the contents of input files, filled on first use
+        self._inputDigests = None
         
         # stack (LIFO) of file names currently in processing
         self.location = []  
 
         # list of devel types encountered
         self.develTypes = []
+
+        # list of (name, path) for all include statements processed
+        self.includes = []
+
+        # list of files used to build a model loaded from cache
+        self._cachedFiles = None
     
     #-------------------
     #  Public methods --
@@ -208,22 +221,61 @@ class HddlReader ( object ) :
                 return True
         return False
 
+    def inputFiles(self):
+        '''
+        Returns the list of all files which were used to build the model, 
+        including files that were included, should be called after read()
+        '''
+        if self._cachedFiles is not None: return self._cachedFiles[:]
+        files = [f for f, data in self.processed]
+        return files + [path for inc, path in self.includes if path not in files]
+
+    def _readData(self, file):
+        '''
+        Returns tuple (data, digest) for a file, every file is read only once,
+        file identity is determined from its inode or real path
+        '''
+        try:
+            st = os.stat(file)
+            key = (st.st_dev, st.st_ino) if st.st_ino else os.path.realpath(file)
+        except OSError:
+            key = os.path.realpath(file)
+        res = self._fileData.get(key)
+        if res is None:
+            with open(file) as f:
+                data = f.read()
+            res = self._fileData[key] = (data, dataDigest(data))
+        return res
+
     def _processed(self, file):
         ''' 
-        Check if file is already processed, just compare file data 
-        byte-by-byte with the data from files already processed 
+        Check if file is already processed, file is considered processed if 
+        its contents are identical to one of the files already processed 
         '''
-        data = open(file).read()
-        for f, d in self.processed:
-            if data == d:
-                return True
-        return False
+        return self._readData(file)[1] in self._processedDigests
+
+    def _isIncluded(self, file):
+        '''
+        Returns false if included file has the same contents as one of the input files,
+        this is called for files which were not processed yet
+        '''
+        if self._inputDigests is None:
+            self._inputDigests = set(self._readData(f)[1] for f in self.files)
+        return self._readData(file)[1] not in self._inputDigests
 
     def read( self ) :
         '''
         Read all files and build a model
         '''
 
+        cache = None
+        if self.cacheDir:
+            cache = ModelCache(self.cacheDir, self.files, self.inc_dir, self.parseDevelTypes)
+            cached = cache.load()
+            if cached is not None:
+                model, self.develTypes, self._cachedFiles, self.includes = cached
+                return model
+
         # model is the global namespace
         model = Package('')
         self._initTypes(model)
@@ -233,6 +285,8 @@ class HddlReader ( object ) :
             logging.debug("HddlReader.read: opening file %s", file)
             self._readFile( file, model, False )
 
+        if cache: cache.store(model, self.develTypes, self.processed, self.includes)
+
         # return the model
         return model
 
@@ -246,11 +300,12 @@ class HddlReader ( object ) :
         """
 
         # opne file and read its data
-        data = open(file).read()
+        data, digest = self._readData(file)
 
         # remember current file name 
         self.location.append(file)
         self.processed.append((file, data))
+        self._processedDigests.setdefault(digest, file)
 
         parser = HddlYacc(debug=0)
         
@@ -298,6 +353,7 @@ class HddlReader ( object ) :
             msg = "Cannot locate include file '{0}'".format(file)
             raise _error(self.location[-1], _lineno(indict), msg)
         logging.debug("HddlReader._parseInclude: found file %s", path)
+        self.includes.append((file, path))
 
         # if this file was processed already just skip it
         if self._processed(path):
@@ -305,11 +361,7 @@ class HddlReader ( object ) :
             return
 
         # if the include file is in the list of regular files then process it as regular file
-        included = True
-        for f in self.files:
-            if not self._processed(f) and _cmpFiles(path, f) :
-                included = False
-                break
+        included = self._isIncluded(path)
 
         # remember all includes
         model.use.append(dict(file=file, cpp_headers=headers))
@@ -529,7 +581,8 @@ class HddlReader ( object ) :
         """Method which parses definition of h5 dataset"""
 
         # check tag names
-        self._checktags(dsdecl, ['method', 'vlen', 'external', 'zero_dims', 'doc', 'method_domain'])
+        self._checktags(dsdecl, ['method', 'vlen', 'external', 'zero_dims', 'doc', 'method_domain',
+                                 'chunk', 'deflate', 'shuffle'])
 
         dsname = dsdecl['name']
 
@@ -564,6 +617,20 @@ class HddlReader ( object ) :
         # optional schema version in tags
         schema_version = self._getIntTag(dsdecl, 'schema_version', 0)
 
+        # optional storage hints, they override chunk policy and compression options given at run time
+        chunk = self._getIntTag(dsdecl, 'chunk')
+        if chunk is not None and chunk <= 0:
+            msg = "chunk() tag argument must be positive number"
+            raise _error(self.location[-1], _lineno(dsdecl), msg)
+        deflate = self._getIntTag(dsdecl, 'deflate')
+        if deflate is not None and not -1 <= deflate <= 9:
+            msg = "deflate() tag argument must be compression level 0-9 or -1 for no compression"
+            raise _error(self.location[-1], _lineno(dsdecl), msg)
+        shuffle = _tagval(dsdecl, 'shuffle', [])
+        if len(shuffle) > 1 or [arg for arg in shuffle if arg not in (0, 1)]:
+            msg = "shuffle tag accepts one optional argument 0 or 1"
+            raise _error(self.location[-1], _lineno(dsdecl), msg)
+
         # make dataset
         ds = H5Dataset(name = dsname, 
                        parent = h5type, 
@@ -901,14 +968,8 @@ class HddlReader ( object ) :
 
     def _findInclude(self, inc):
         
-        # look in every directory in include path
-        for dir in self.inc_dir:            
-            path = os.path.join(dir, inc)
-            if  os.path.isfile(path):
-                return path
-        
-        # Not found
-        return None
+        # same search as used by ModelCache to validate cached models
+        return findInclude(inc, self.inc_dir)
 
     def _initTypes(self, ns):
         """ Define few basic types in global namespace """
@@ -27,7 +27,12 @@ __version__ = "$Revision$"
 #  Imports of standard modules --
 #--------------------------------
 import sys
+import os
 import warnings
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 #---------------------------------
 #  Imports of base class module --
@@ -64,6 +69,45 @@ def _makepos(p, n=0, m=-1):
         plex = (plex[0], p.lexspan(m)[1])
     return pline, plex
 
+# LR tables shared by all parser instances in this process, indexed by
+# grammar signature, each value is tuple (method, action, goto, productions)
+# with productions stored as tuples suitable for yacc.MiniProduction
+_lr_tables = {}
+
+# default location of the persistent copy of the tables
+_PICKLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hddl_parsetab.pickle')
+
+def _prodTuple(p):
+    ''' convert production object (Production or MiniProduction) to a tuple '''
+    if p.func:
+        return (p.str, p.name, p.len, p.func, p.file, p.line)
+    return (str(p), p.name, p.len, None, None, None)
+
+def _readTables(picklefile, signature):
+    ''' read tables from pickle file, returns None if file is missing or out of date '''
+    if not picklefile or not os.path.isfile(picklefile): return None
+    lr = yacc.LRTable()
+    try:
+        if lr.read_pickle(picklefile) != signature: return None
+    except Exception:
+        # any problem with the file means we have to rebuild tables
+        return None
+    return (lr.lr_method, lr.lr_action, lr.lr_goto, [_prodTuple(p) for p in lr.lr_productions])
+
+def _writeTables(picklefile, signature, tables):
+    ''' save tables to a pickle file in yacc format, errors are ignored (e.g. read-only release) '''
+    if not picklefile: return
+    method, action, goto, productions = tables
+    # write to a temporary file first so that concurrent readers never see partial file
+    tmpfile = "%s.%d.tmp" % (picklefile, os.getpid())
+    try:
+        with open(tmpfile, "wb") as outf:
+            for obj in (yacc.__tabversion__, method, signature, action, goto, productions):
+                pickle.dump(obj, outf, 2)
+        os.rename(tmpfile, picklefile)
+    except (IOError, OSError):
+        if os.path.exists(tmpfile): os.remove(tmpfile)
+
 #------------------------
 # Exported definitions --
 #------------------------
@@ -77,12 +121,45 @@ class HddlYacc ( object ) :
     #----------------
     #  Constructor --
     #----------------
-    def __init__(self, model=None, **kwargs):
+    def __init__(self, model=None, picklefile=_PICKLE_FILE, **kwargs):
+        '''Constructor
+
+           @param model       not used
+           @param picklefile  name of the file for persistent parser tables, 
+                              if empty or None then tables are not saved
+           @param kwargs      other keyword arguments passed to yacc.yacc()
+
+        LALR tables are built only once per process (or read from pickle file)
+        and shared between all instances, debug mode always rebuilds tables.
+        '''
 
         kw = dict(write_tables=0)
         kw.update(kwargs)
-        
-        self.parser = yacc.yacc(module=self, **kw)
+
+        if kw.get('debug', yacc.yaccdebug):
+            self.parser = yacc.yacc(module=self, **kw)
+            return
+
+        pdict = dict((k, getattr(self, k)) for k in dir(self))
+        pinfo = yacc.ParserReflect(pdict, log=yacc.NullLogger())
+        pinfo.get_all()
+        signature = pinfo.signature()
+
+        tables = _lr_tables.get(signature)
+        if tables is None:
+            tables = _readTables(picklefile, signature)
+            if tables is None:
+                parser = yacc.yacc(module=self, **kw)
+                tables = (kw.get('method', 'LALR'), parser.action, parser.goto, [_prodTuple(p) for p in parser.productions])
+                _writeTables(picklefile, signature, tables)
+            _lr_tables[signature] = tables
+
+        # productions are bound to methods of this instance
+        lr = yacc.LRTable()
+        lr.lr_method, lr.lr_action, lr.lr_goto = tables[:3]
+        lr.lr_productions = [yacc.MiniProduction(*p) for p in tables[3]]
+        lr.bind_callables(pdict)
+        self.parser = yacc.LRParser(lr, pinfo.error_func)
 
     def parse(self, input, name):
 
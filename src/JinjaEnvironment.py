@@ -1,16 +1,68 @@
-import jinja2 as ji
+import os
 
-from psddl.TemplateLoader import TemplateLoader
+# jinja2 is imported on first use so that modules which use templates can be
+# imported cheaply, e.g. to list backends or their options
+
+# Compiled templates are cached on disk, the cache directory is taken from
+# PSDDL_JINJA_CACHE envvar, default is jinja's per-user temporary directory,
+# empty value disables the cache. Cache entries are keyed by template name
+# and checked against the checksum of template source.
+_bytecode_cache = None
+
+# environments created so far, key is (package, templateSubDir)
+_environments = {}
+
+def _getBytecodeCache():
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        import jinja2 as ji
+        cachedir = os.environ.get('PSDDL_JINJA_CACHE')
+        if cachedir == '':
+            _bytecode_cache = False
+        else:
+            if cachedir and not os.path.isdir(cachedir):
+                try:
+                    os.makedirs(cachedir)
+                except OSError:
+                    pass
+            try:
+                _bytecode_cache = ji.FileSystemBytecodeCache(cachedir or None)
+            except (IOError, OSError, RuntimeError):
+                # jinja could not create default cache directory
+                _bytecode_cache = False
+    return _bytecode_cache or None
 
 def getJinjaEnvironment(package=None, templateSubDir=None):
+    '''Returns jinja environment for templates of a package, environment is
+    created on first call and shared by all callers.'''
     if package is None and templateSubDir is None:
-        loader = TemplateLoader()
+        key = None
     else:
         assert package and templateSubDir, "if setting one of package/templateSubDir, must set the other"
-        loader = TemplateLoader(package=package, templateSubDir=templateSubDir)
-    jiEnv = ji.Environment(loader=loader,
-                           cache_size=0,
-                           trim_blocks=True,
-                           line_statement_prefix='$',
-                           line_comment_prefix='$$')
+        key = (package, templateSubDir)
+    jiEnv = _environments.get(key)
+    if jiEnv is None:
+        import jinja2 as ji
+        from psddl.TemplateLoader import TemplateLoader
+        if key is None:
+            loader = TemplateLoader()
+        else:
+            loader = TemplateLoader(package=package, templateSubDir=templateSubDir)
+        jiEnv = ji.Environment(loader=loader,
+                               cache_size=0,
+                               bytecode_cache=_getBytecodeCache(),
+                               trim_blocks=True,
+                               line_statement_prefix='$',
+                               line_comment_prefix='$$')
+        _environments[key] = jiEnv
     return jiEnv
+
+def compileTemplates(package=None, templateSubDir=None):
+    '''Compile all templates for a package and store them in the bytecode cache,
+    this can be run once after installation so that psddlc never compiles
+    templates. Returns the number of compiled templates.'''
+    env = getJinjaEnvironment(package, templateSubDir)
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return len(names)
@@ -0,0 +1,195 @@
+#--------------------------------------------------------------------------
+# File and Version Information:
+#  $Id$
+#
+# Description:
+#  Module ModelCache...
+#
+#------------------------------------------------------------------------
+
+"""On-disk cache of the models built by HddlReader.
+
+Cache entry is a pickled model (global Package) together with the list
+of all files that were read to build it. Entry name is a digest of the
+contents of the input files, include path, parse-devel flag and the
+sources of psddl package itself. Included files are not known before
+parsing, they are validated when entry is loaded: each include name must
+resolve to the same file and the contents of every file must have the
+same digest, otherwise the entry is ignored and model is rebuilt.
+
+This software was developed for the LCLS project.  If you use all or
+part of it, please give an appropriate acknowledgment.
+
+@version $Id$
+"""
+
+
+#------------------------------
+#  Module's version from CVS --
+#------------------------------
+__version__ = "$Revision$"
+# $Source$
+
+#--------------------------------
+#  Imports of standard modules --
+#--------------------------------
+import sys
+import os
+import hashlib
+import logging
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+#---------------------------------
+#  Imports of base class module --
+#---------------------------------
+
+#-----------------------------
+# Imports for other modules --
+#-----------------------------
+
+#----------------------------------
+# Local non-exported definitions --
+#----------------------------------
+
+# change this when format of the cache entry changes
+_FORMAT = 1
+
+# digest of psddl sources, computed once
+_code_digest = None
+
+#------------------------
+# Exported definitions --
+#------------------------
+
+def codeDigest():
+    ''' digest of all python modules in psddl package, model depends on all of them '''
+    global _code_digest
+    if _code_digest is None:
+        pkgdir = os.path.dirname(os.path.abspath(__file__))
+        h = hashlib.sha1()
+        for name in sorted(os.listdir(pkgdir)):
+            if name.endswith('.py'):
+                h.update(name.encode())
+                h.update(fileDigest(os.path.join(pkgdir, name)).encode())
+        _code_digest = h.hexdigest()
+    return _code_digest
+
+def dataDigest(data):
+    ''' Returns hex digest of the file data (bytes or str) '''
+    if not isinstance(data, bytes): data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+def fileDigest(path):
+    ''' Returns hex digest of the file contents '''
+    with open(path, 'rb') as f:
+        return dataDigest(f.read())
+
+def findInclude(inc, inc_dir):
+    ''' Find include file in the include path, returns None if not found, used by HddlReader too '''
+    for dir in inc_dir:
+        path = os.path.join(dir, inc)
+        if os.path.isfile(path):
+            return path
+    return None
+
+#---------------------
+#  Class definition --
+#---------------------
+class ModelCache ( object ) :
+
+    #----------------
+    #  Constructor --
+    #----------------
+    def __init__ ( self, cachedir, ddlfiles, inc_dir, parseDevel ) :
+        '''Constructor
+
+           @param cachedir    directory where cache entries are stored
+           @param ddlfiles    list of input file names
+           @param inc_dir     list of include directories
+           @param parseDevel  value of the parse-devel flag
+        '''
+        self.cachedir = cachedir
+        self.inc_dir = list(inc_dir or [])
+
+        h = hashlib.sha1()
+        key = [_FORMAT, sys.version_info[0], codeDigest(), self.inc_dir, bool(parseDevel)]
+        key += [(f, fileDigest(f)) for f in ddlfiles]
+        h.update(repr(key).encode())
+        self.path = os.path.join(cachedir, 'model-' + h.hexdigest() + '.pickle')
+
+    #-------------------
+    #  Public methods --
+    #-------------------
+
+    def load(self):
+        '''
+        Returns tuple (model, develTypes, files, includes) or None if there is no 
+        valid entry in cache, files is the list of all files which were read to 
+        build the model, includes is the list of (name, path) for all includes.
+        '''
+        try:
+            with open(self.path, 'rb') as f:
+                entry = pickle.load(f)
+        except Exception as ex:
+            logging.debug("ModelCache.load: no cached model %s: %s", self.path, ex)
+            return None
+
+        # included files must be resolved in the same way
+        for inc, path in entry['includes']:
+            if findInclude(inc, self.inc_dir) != path:
+                logging.debug("ModelCache.load: include file %s resolved differently", inc)
+                return None
+
+        # and all files read must be unchanged
+        for path, digest in entry['files']:
+            try:
+                if fileDigest(path) != digest:
+                    logging.debug("ModelCache.load: file %s has changed", path)
+                    return None
+            except (IOError, OSError):
+                return None
+
+        logging.debug("ModelCache.load: using cached model %s", self.path)
+        return entry['model'], entry['develTypes'], [path for path, digest in entry['files']], entry['includes']
+
+    def store(self, model, develTypes, files, includes):
+        '''
+        Save model in the cache, errors are logged and otherwise ignored.
+
+          @param model       model instance (global namespace)
+          @param develTypes  list of devel types produced by reader
+          @param files       list of (path, data) for all files read
+          @param includes    list of (name, path) for all include statements
+        '''
+        files = [(path, dataDigest(data)) for path, data in files]
+        # includes which were skipped as duplicates still affect the model
+        paths = set(path for path, digest in files)
+        try:
+            files += [(path, fileDigest(path)) for inc, path in includes if path not in paths]
+        except (IOError, OSError) as ex:
+            logging.warning("ModelCache.store: failed to read included file: %s", ex)
+            return
+        entry = dict(model=model, develTypes=develTypes, includes=includes, files=files)
+
+        # write to a temporary file first so that concurrent readers never see partial file
+        tmpfile = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            if not os.path.isdir(self.cachedir): os.makedirs(self.cachedir)
+            with open(tmpfile, 'wb') as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmpfile, self.path)
+        except Exception as ex:
+            logging.warning("ModelCache.store: failed to save model in cache: %s", ex)
+            if os.path.exists(tmpfile): os.remove(tmpfile)
+
+#
+#  In case someone decides to run this module
+#
+if __name__ == "__main__" :
+
+    # In principle we can try to run test suite for this module,
+    # have to think about it later. Right now just abort.
+    sys.exit ( "Module is not supposed to be run as main module" )
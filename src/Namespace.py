@@ -64,6 +64,7 @@ class Namespace ( object ) :
         self.parent = parent
         self._children = {}
         self._ordered = []
+        self._kinds = {}     # class name -> ordered list of children of that class (or subclass)
 
         if parent: parent.add(self)
 
@@ -90,6 +91,8 @@ class Namespace ( object ) :
             raise KeyError('name %s already defined in namespace %s' % (obj.name, self.fullName()))
         self._children[obj.name] = obj
         self._ordered.append(obj)
+        for cls in type(obj).__mro__[:-1]:
+            self._kinds.setdefault(cls.__name__, []).append(obj)
 
     def lookup(self, namestr, type=None):
         """ Implementation of the name lookup in the namespaces.
@@ -129,27 +132,22 @@ class Namespace ( object ) :
         return self._children.get(name)
 
     def namespaces(self):
-        return self.__objects(Namespace)
+        return self.__objects('Namespace')
 
     def packages(self):
-        from psddl.Package import Package
-        return self.__objects(Package)
+        return self.__objects('Package')
 
     def types(self):
-        from psddl.Type import Type
-        return self.__objects(Type)
+        return self.__objects('Type')
 
     def enums(self):
-        from psddl.Enum import Enum
-        return self.__objects(Enum)
+        return self.__objects('Enum')
 
     def constants(self):
-        from psddl.Constant import Constant
-        return self.__objects(Constant)
+        return self.__objects('Constant')
 
     def attributes(self):
-        from psddl.Attribute import Attribute
-        return self.__objects(Attribute)
+        return self.__objects('Attribute')
     
     def attributes_and_bitfields(self):
         for attr in self.attributes():
@@ -160,12 +158,22 @@ class Namespace ( object ) :
                 yield attr
     
     def methods(self):
-        from psddl.Method import Method
-        return self.__objects(Method)
+        return self.__objects('Method')
+
+    def allTypes(self):
+        """Generator for all types defined in this namespace and in its 
+        sub-packages, depth-first in the order of definition"""
+        for ns in self.namespaces():
+            kind = type(ns).__name__
+            if kind == 'Package':
+                for t in ns.allTypes(): yield t
+            elif kind == 'Type':
+                yield ns
     
-    def __objects(self, type):
-        """Get the list of objects of given type defined in this namespace"""
-        return [ch for ch in self._ordered if isinstance(ch, type)]
+    def __objects(self, kind):
+        """Get the list of objects of given class (name) defined in this namespace,
+        returned list is shared and must not be modified by caller"""
+        return self._kinds.get(kind, [])
         
 
 #
@@ -0,0 +1,152 @@
+#--------------------------------------------------------------------------
+# File and Version Information:
+#  $Id$
+#
+# Description:
+#  Module OutputFile...
+#
+#------------------------------------------------------------------------
+
+"""File object for generated files which does not touch unchanged files.
+
+Data are written into a temporary file in the same directory, when file
+is closed the temporary file replaces the output file only if contents
+differ, otherwise it is removed and output file keeps its modification
+time so that build system does not recompile it. If the generation fails
+before the file is closed the temporary file is removed with discard() or
+discardOutputFiles(), existing output file is not touched.
+
+This software was developed for the LCLS project.  If you use all or
+part of it, please give an appropriate acknowledgment.
+
+@version $Id$
+"""
+
+
+#------------------------------
+#  Module's version from CVS --
+#------------------------------
+__version__ = "$Revision$"
+# $Source$
+
+#--------------------------------
+#  Imports of standard modules --
+#--------------------------------
+import sys
+import os
+
+#---------------------------------
+#  Imports of base class module --
+#---------------------------------
+
+#-----------------------------
+# Imports for other modules --
+#-----------------------------
+
+#----------------------------------
+# Local non-exported definitions --
+#----------------------------------
+
+# names of all output files closed since last call to takeOutputFiles()
+_outputs = []
+
+# all files which are not closed or discarded yet
+_open = []
+
+#------------------------
+# Exported definitions --
+#------------------------
+
+def takeOutputFiles():
+    ''' Returns the list of output files closed so far and clears it '''
+    res = _outputs[:]
+    del _outputs[:]
+    return res
+
+def discardOutputFiles():
+    ''' Discards all output files which are not closed yet, used when generation fails '''
+    for file in _open[:]:
+        file.discard()
+
+#---------------------
+#  Class definition --
+#---------------------
+class OutputFile ( object ) :
+
+    #----------------
+    #  Constructor --
+    #----------------
+    def __init__ ( self, name, buffering=-1 ) :
+        '''Constructor
+
+           @param name       output file name
+           @param buffering  same as for open(), unbuffered output (0) becomes line-buffered on Python 3
+        '''
+        self.name = name
+        self.tmpname = "%s.tmp%d" % (name, os.getpid())
+        if buffering == 0 and sys.version_info[0] > 2: buffering = 1
+        self._file = open(self.tmpname, 'w', buffering)
+        self.changed = None
+        _open.append(self)
+
+    #-------------------
+    #  Public methods --
+    #-------------------
+
+    def write(self, data):
+        self._file.write(data)
+
+    def writelines(self, lines):
+        self._file.writelines(lines)
+
+    def flush(self):
+        self._file.flush()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def close(self):
+        ''' Close temporary file and replace output file if contents changed '''
+        if self._file.closed: return
+        self._file.close()
+        _open.remove(self)
+
+        self.changed = True
+        if os.path.isfile(self.name) and os.path.getsize(self.name) == os.path.getsize(self.tmpname):
+            with open(self.name, 'rb') as f1:
+                with open(self.tmpname, 'rb') as f2:
+                    self.changed = f1.read() != f2.read()
+
+        if self.changed:
+            os.rename(self.tmpname, self.name)
+        else:
+            os.remove(self.tmpname)
+        _outputs.append(self.name)
+
+    def discard(self):
+        ''' Close and remove temporary file, output file is not changed '''
+        if self._file.closed: return
+        self._file.close()
+        _open.remove(self)
+        if os.path.exists(self.tmpname): os.remove(self.tmpname)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # do not leave partial output behind
+            self.discard()
+        return False
+
+#
+#  In case someone decides to run this module
+#
+if __name__ == "__main__" :
+
+    # In principle we can try to run test suite for this module,
+    # have to think about it later. Right now just abort.
+    sys.exit ( "Module is not supposed to be run as main module" )
@@ -0,0 +1,210 @@
+#--------------------------------------------------------------------------
+# File and Version Information:
+#  $Id$
+#
+# Description:
+#  Module PerfectHash...
+#
+#------------------------------------------------------------------------
+
+"""Minimal perfect hash for a set of strings.
+
+Uses "hash and displace" method: every key is first assigned to one of
+N buckets (N is the number of keys) with the hash function seeded with
+zero. Buckets are then placed in order of decreasing size: for a bucket
+with several keys the search finds a seed which sends all its keys to
+distinct free slots, a bucket with one key is put directly into a free
+slot. Displacement table stores the seed (positive) or the slot number
+(negative, -slot-1) for each bucket. Lookup costs two hash evaluations
+at most and one string comparison which rejects unknown strings.
+
+Same hash function and lookup is generated in C++ by code() method, both
+implementations must produce identical results.
+
+This software was developed for the LCLS project.  If you use all or
+part of it, please give an appropriate acknowledgment.
+
+@version $Id$
+"""
+
+
+#------------------------------
+#  Module's version from CVS --
+#------------------------------
+__version__ = "$Revision$"
+# $Source$
+
+#--------------------------------
+#  Imports of standard modules --
+#--------------------------------
+import sys
+
+#---------------------------------
+#  Imports of base class module --
+#---------------------------------
+
+#-----------------------------
+# Imports for other modules --
+#-----------------------------
+
+#----------------------------------
+# Local non-exported definitions --
+#----------------------------------
+
+# FNV-1a constants
+_FNV_OFFSET = 2166136261
+_FNV_PRIME = 16777619
+
+# give up if seed for one bucket cannot be found after that many tries
+_MAX_SEED = 1 << 24
+
+_code = """
+namespace {
+
+    // minimal perfect hash for {{nkeys}} strings, generated by psddl
+    const uint32_t str_hash_size = {{size}};
+    const int32_t str_hash_displace[{{size}}] = {
+{{displace}}
+    };
+    const char* const str_hash_keys[{{size}}] = {
+{{keys}}
+    };
+
+    // FNV-1a hash with the seed mixed into initial value and MurmurHash3 finalizer
+    uint32_t str_hash(uint32_t seed, const char* str)
+    {
+        uint32_t hash = {{offset}}U ^ seed;
+        for (; *str; ++str) {
+            hash = (hash ^ uint32_t((unsigned char)*str)) * {{prime}}U;
+        }
+        hash ^= hash >> 16;
+        hash *= 0x85ebca6bU;
+        hash ^= hash >> 13;
+        hash *= 0xc2b2ae35U;
+        hash ^= hash >> 16;
+        return hash;
+    }
+
+    // returns index of a string in str_hash_keys or -1 if string is not there
+    int str_index(const char* str)
+    {
+        int32_t d = str_hash_displace[str_hash(0, str) % str_hash_size];
+        uint32_t idx = d < 0 ? uint32_t(-d-1) : str_hash(uint32_t(d), str) % str_hash_size;
+        return std::strcmp(str_hash_keys[idx], str) == 0 ? int(idx) : -1;
+    }
+}"""
+
+_codeEmpty = """
+namespace {
+
+    // there are no known strings, generated by psddl
+    int str_index(const char*)
+    {
+        return -1;
+    }
+}"""
+
+def _cstring(string):
+    ''' make C string literal '''
+    return '"' + string.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+#------------------------
+# Exported definitions --
+#------------------------
+
+def strHash(seed, string):
+    ''' FNV-1a hash of the UTF-8 representation of string, seed is mixed into initial value,
+    low bits of FNV-1a depend only on low bits of input, result is finalized with MurmurHash3 
+    mixer so that any bits can be used for modulo '''
+    hash = _FNV_OFFSET ^ seed
+    for ch in bytearray(string.encode('utf-8')):
+        hash = ((hash ^ ch) * _FNV_PRIME) & 0xffffffff
+    hash ^= hash >> 16
+    hash = (hash * 0x85ebca6b) & 0xffffffff
+    hash ^= hash >> 13
+    hash = (hash * 0xc2b2ae35) & 0xffffffff
+    hash ^= hash >> 16
+    return hash
+
+#---------------------
+#  Class definition --
+#---------------------
+class PerfectHash ( object ) :
+
+    #----------------
+    #  Constructor --
+    #----------------
+    def __init__ ( self, keys ) :
+        '''Constructor, builds hash for a set of keys
+
+           @param keys  list of unique strings, index() of a key is its position in self.keys
+        '''
+        if len(set(keys)) != len(keys):
+            raise ValueError("PerfectHash: keys are not unique")
+
+        size = len(keys)
+        self.displace = [0] * size
+        slots = [None] * size
+
+        buckets = [[] for i in range(size)]
+        for key in keys:
+            buckets[strHash(0, key) % size].append(key)
+
+        # biggest buckets first, order of equal buckets is fixed for reproducible result
+        order = sorted(range(size), key=lambda b: (-len(buckets[b]), b))
+
+        free = []
+        for b in order:
+            bucket = buckets[b]
+            if len(bucket) > 1:
+                seed = 1
+                while True:
+                    pos = [strHash(seed, key) % size for key in bucket]
+                    if len(set(pos)) == len(pos) and all(slots[p] is None for p in pos):
+                        break
+                    seed += 1
+                    if seed > _MAX_SEED:
+                        raise ValueError("PerfectHash: failed to find seed for bucket %s" % bucket)
+                for p, key in zip(pos, bucket):
+                    slots[p] = key
+                self.displace[b] = seed
+            elif bucket:
+                # all multi-key buckets are placed already, free slots do not change
+                if not free: free = [p for p in range(size-1, -1, -1) if slots[p] is None]
+                p = free.pop()
+                slots[p] = bucket[0]
+                self.displace[b] = -p-1
+
+        self.keys = slots
+
+    #-------------------
+    #  Public methods --
+    #-------------------
+
+    def index(self, key):
+        ''' Returns index of the key in self.keys or -1 if key is not known, same as str_index() in C++ '''
+        if not self.keys: return -1
+        size = len(self.keys)
+        d = self.displace[strHash(0, key) % size]
+        idx = -d-1 if d < 0 else strHash(d, key) % size
+        return idx if self.keys[idx] == key else -1
+
+    def code(self):
+        ''' Returns C++ code for str_index() function, code needs <cstring> and <stdint.h> '''
+        if not self.keys: return _codeEmpty
+        subs = dict(nkeys=len(self.keys), size=len(self.keys), offset=_FNV_OFFSET, prime=_FNV_PRIME,
+                    displace=',\n'.join('        %d' % d for d in self.displace),
+                    keys=',\n'.join('        ' + _cstring(key) for key in self.keys))
+        code = _code
+        for name, value in subs.items():
+            code = code.replace('{{%s}}' % name, str(value))
+        return code
+
+#
+#  In case someone decides to run this module
+#
+if __name__ == "__main__" :
+
+    # In principle we can try to run test suite for this module,
+    # have to think about it later. Right now just abort.
+    sys.exit ( "Module is not supposed to be run as main module" )
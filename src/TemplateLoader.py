@@ -51,10 +51,52 @@ import jinja2 as ji
 # Local non-exported definitions --
 #----------------------------------
 
+# Index of all template files read so far, shared by all loader instances.
+# Key is the path of the template file, value is a tuple (mtime, size, templates)
+# where templates is a dict mapping sub-template name to its source.
+_index = {}
+
+def _splitTemplates(source):
+    ''' split contents of template file into individual templates, returns dict '''
+    templates = {}
+    tmpl = None
+    for line in source.splitlines(True):
+        words = line.split()
+        if words and words[0] == "::::template::::":
+            tmpl = templates.setdefault(words[1], [])
+        elif line and line[0] == ':':
+            pass
+        elif tmpl is not None:
+            tmpl.append(line)
+    return dict((name, ''.join(lines)) for name, lines in templates.items())
+
+def _templates(path, encoding):
+    ''' returns tuple (mtime, templates) for a template file, file is re-read if it has changed '''
+    st = os.stat(path)
+    entry = _index.get(path)
+    if entry is None or entry[0] != st.st_mtime or entry[1] != st.st_size:
+        with open(path, 'rb') as f:
+            source = f.read().decode(encoding)
+        entry = _index[path] = (st.st_mtime, st.st_size, _splitTemplates(source))
+    return entry[0], entry[2]
+
 #------------------------
 # Exported definitions --
 #------------------------
 
+def templateFiles(package='psddl', templateSubDir='templates'):
+    '''Returns the list of template files visible to the loader for given package,
+    when the same file name appears in several $SIT_DATA directories only the first 
+    one is returned (the one that loader uses)'''
+    files = {}
+    for dir in os.environ.get('SIT_DATA', '').split(':'):
+        tdir = os.path.join(dir, package, templateSubDir)
+        if not dir or not os.path.isdir(tdir): continue
+        for name in sorted(os.listdir(tdir)):
+            path = os.path.join(tdir, name)
+            if name not in files and os.path.isfile(path):
+                files[name] = path
+    return [files[name] for name in sorted(files)]
 
 #---------------------
 #  Class definition --
@@ -73,48 +115,53 @@ class TemplateLoader(ji.FileSystemLoader):
         package.
 
         Due to an issue with jinja 2.8, we cache the templates ourselve, we
-        expect the environment to be created with a cache_size of 0
+        expect the environment to be created with a cache_size of 0. Each
+        template file is split into sub-templates once, the result is shared 
+        between all loader instances and refreshed when file changes.
         '''
         self.package=package
         self.templateSubDir=templateSubDir
         path = os.environ['SIT_DATA'].split(':')
         ji.FileSystemLoader.__init__(self, path)
 
-        self.template_cache={}
     #-------------------
     #  Public methods --
     #-------------------
 
     def get_source(self, environment, template):
-        if template in self.template_cache:
-            return self.template_cache[template]
-        orig_template_name = template
         # template name is the file name followed by "?template"
         fname, template = template.split('?')
 
         # prepend package/templateSubDir to path (defaults to psddl/templates)
-        fname = os.path.join("%s/%s" % (self.package,self.templateSubDir), fname)
-
-        # call base class method
-        source, path, helper = ji.FileSystemLoader.get_source(self, environment, fname)
-
-        # iterate over lines, find a template
-        tmpl = []
-        collect = False
-        for line in source.splitlines(True):
-            words = line.split()
-            if words and words[0] == "::::template::::":
-                if words[1] == template:
-                    collect = True
-                else:
-                    collect = False
-            elif line and line[0] == ':':
-                pass
-            elif collect: 
-                tmpl.append(line)
-        templateSource = ''.join(tmpl)
-        self.template_cache[orig_template_name] = (templateSource, path, helper)
-        return ''.join(tmpl), path, helper
+        fname = os.path.join(self.package, self.templateSubDir, fname)
+
+        # find first matching file in search path
+        for dir in self.searchpath:
+            path = os.path.join(dir, fname)
+            if os.path.isfile(path): break
+        else:
+            raise ji.TemplateNotFound(fname)
+
+        # templates from this file, parsed once and shared by all loaders
+        mtime, templates = _templates(path, self.encoding)
+
+        def uptodate():
+            try:
+                return os.path.getmtime(path) == mtime
+            except OSError:
+                return False
+
+        # missing template is the same as empty template
+        return templates.get(template, ''), path, uptodate
+
+    def list_templates(self):
+        # names of all sub-templates in all template files of the package
+        names = []
+        for path in templateFiles(self.package, self.templateSubDir):
+            mtime, templates = _templates(path, self.encoding)
+            fname = os.path.basename(path)
+            names += [fname + '?' + name for name in sorted(templates)]
+        return names
 
     #--------------------------------
     #  Static/class public methods --
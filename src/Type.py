@@ -90,6 +90,7 @@ class Type ( Namespace ) :
         self.ctors = []   # constructors
 
         self.h5schemas = []    # list of hdf schemas for this type.
+        self.h5defaultSchema = None    # generated default hdf schema (see H5Type.defaultSchema)
 
     @property
     def basic(self):
@@ -261,6 +262,41 @@ class Type ( Namespace ) :
         if 'no-sizeof' not in self.tags:
             self._genSizeof()
 
+    def naturalAlign(self):
+        """Returns alignment of a value type if its layout calculated by calcOffsets()
+        is the same as natural C layout of its members (declared with attribute storage 
+        types, enums are stored as their base type), None otherwise. For such types 
+        classes generated for pdsdata (possibly packed) and psana have identical layout."""
+
+        if not self.value_type or self.basic or self.external or self.base: return None
+
+        offset = 0
+        maxalign = 1
+        for attr in self.attributes():
+
+            if not attr.isfixed(): return None
+            stor_type = attr.stor_type
+
+            count = 1
+            if attr.shape:
+                for dim in attr.shape.dims:
+                    dim = ExprVal(dim, attr.shape.ns).value
+                    if type(dim) is not int: return None
+                    count *= dim
+
+            # natural alignment of basic type is its size
+            size = ExprVal(stor_type.size).value
+            align = size if stor_type.basic else stor_type.naturalAlign()
+            if type(size) is not int or not size or not align or not count: return None
+            offset = (offset + align - 1) // align * align
+            maxalign = max(maxalign, align)
+            if ExprVal(attr.offset).value != offset: return None
+            offset += size * count
+
+        offset = (offset + maxalign - 1) // maxalign * maxalign
+        if ExprVal(self.size).value != offset: return None
+        return maxalign
+
     def _genSizeof(self):
 
         # generate public _sizeof method
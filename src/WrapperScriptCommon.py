@@ -4,6 +4,9 @@ import sys
 import glob
 import argparse
 import copy
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 '''functions common to the wrapper scripts
 '''
@@ -90,6 +93,61 @@ def getDDLfilenames(pkg, exclude=None, include=None, verbose=False):
             sys.stdout.flush()
     return ddlFiles
 
+# number of parallel jobs for runCommands(), set by standardWrapper from -j option
+defaultJobs = 1
+
+def _runCommand(cmd):
+    '''runs one shell command, returns (cmd, returncode, output) with stdout
+    and stderr of the command merged together
+    '''
+    proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.communicate()[0]
+    return cmd, proc.returncode, output
+
+def runCommands(commands, jobs=None, verbose=False):
+    '''Runs a list of shell commands (typically psddlc commands, one per package),
+    up to jobs of them concurrently. Output of each command is captured and
+    replayed in the order of the commands list once that command has finished.
+    ARGS:
+      commands - list of shell command strings
+      jobs     - number of concurrent commands, default is defaultJobs (the -j option
+                 of standardWrapper), 0 means number of CPUs
+      verbose  - True to print each command before its output
+
+    RET:
+      0 if all commands succeeded, 1 otherwise. A summary of failed commands is 
+      printed to stderr.
+    '''
+    if jobs is None:
+        jobs = defaultJobs
+    if jobs <= 0:
+        jobs = multiprocessing.cpu_count()
+
+    failed = []
+    pool = ThreadPool(max(1, min(jobs, len(commands))))
+    try:
+        for cmd, rc, output in pool.imap(_runCommand, commands):
+            if verbose:
+                sys.stdout.write("%s\n" % cmd)
+            if output:
+                sys.stdout.write(output.decode() if not isinstance(output, str) else output)
+            sys.stdout.flush()
+            if rc != 0:
+                sys.stderr.write("ERROR: command failed with exit code %s: %s\n" % (rc, cmd))
+                sys.stderr.flush()
+                failed.append(cmd)
+    finally:
+        pool.close()
+        pool.join()
+
+    if failed:
+        sys.stderr.write("ERROR: %d of %d commands failed:\n" % (len(failed), len(commands)))
+        for cmd in failed:
+            sys.stderr.write("  %s\n" % cmd)
+        sys.stderr.flush()
+        return 1
+    return 0
+
 programDescriptionEpilog = '''
 Note, do not use the --devel switch to generate code for production releases.
 '''
@@ -117,6 +175,9 @@ def standardWrapper(description, epilog=programDescriptionEpilog,
     
       verbose - if received verbose switch
 
+      The -j option value is stored in defaultJobs, the commands built from pkgdict
+      should be run with runCommands() to honor it.
+
       pkgdict: is a 2D dict, level one is file package names from the psddldata/data package.
       i.e, keys like 'timetool', 'oceanoptics'
 
@@ -143,8 +204,12 @@ def standardWrapper(description, epilog=programDescriptionEpilog,
     parser.add_argument('-i', '--include', type=str, help="explicitly provid the DDL packages to include as a comma separated list", default=None)
     parser.add_argument('-x', '--exclude', type=str, help="explicitly set the DDL packages to exclude as a comma separated list", default=None)
     parser.add_argument('-s', '--show', action='store_true', help="show default excluded files", default=False)
+    parser.add_argument('-j', '--jobs', type=int, help="number of psddlc commands to run in parallel, 0 for number of CPUs", default=1)
     args = parser.parse_args()
 
+    global defaultJobs
+    defaultJobs = args.jobs
+
     if args.show:
         print("Default exclude: %s" % defaultExclude)
         print("exiting early.")